@@ -1,31 +1,8 @@
-from pydantic import BaseModel
 import pdfplumber
 import json
 from config import *
 from typing import List
-
-# ============================================================
-# MODELOS PYDANTIC PARA ESTRUCTURAR LA EXTRACCIÓN
-# ============================================================
-
-class EntradaDiccionario(BaseModel):
-    """Modelo para una entrada del diccionario"""
-    termino: str
-    definicion: str
-    tecnico: str
-    sentido_biologico: str
-    conflicto: str
-    referencias_cruzadas: list[str]
-    pagina_inicio: int
-    pagina_fin: int
-
-
-class SeccionExtraida(BaseModel):
-    """Modelo para una sección extraída del PDF"""
-    nombre_seccion: str
-    paginas: str
-    contenido_raw: str
-    entradas: list[EntradaDiccionario]
+from calidad import validar_entradas, compactar, guardar_limpias
 
 
 def extraer_seccion_pdf(ruta_pdf: str, pagina_inicio: int, pagina_fin: int) -> str:
@@ -148,17 +125,10 @@ def estructurar_con_gpt(contenido: str, nombre_seccion: str = "desconocida") ->
             data = json.loads(contenido_limpio)
             entradas_chunk = data.get("entradas", [])
 
-            # Filtrar entradas incompletas
-            entradas_validas = []
-            for entrada in entradas_chunk:
-                campos_requeridos = ['termino', 'definicion', 'tecnico', 'sentido_biologico', 'conflicto']
-                # Verificar que los campos principales no estén vacíos o truncados
-                if (entrada.get('termino') and
-                        entrada.get('definicion') and
-                        len(entrada.get('definicion', '')) > 20 and  # Al menos 20 chars
-                        len(entrada.get('tecnico', '')) > 10 and  # Al menos 10 chars
-                        len(entrada.get('sentido_biologico', '')) > 20):  # Al menos 20 chars
-                    entradas_validas.append(entrada)
+            # Validar con el modelo (las incompletas se fusionan después en calidad.py)
+            entradas_validas, errores = validar_entradas(entradas_chunk)
+            for error in errores:
+                print(f"    Entrada descartada ({error['termino']}): {'; '.join(error['errores'])}")
 
             todas_entradas.extend(entradas_validas)
 
@@ -264,6 +234,11 @@ def procesar_diccionario_completo():
         json.dump(todas_las_entradas, f, ensure_ascii=False, indent=2)
     print(f"✓ Guardado: {SALIDA_ENTRADAS_COMPLETO}")
 
+    # Validar, fusionar duplicados y guardar la versión compactada
+    limpias, reporte_calidad = compactar(todas_las_entradas)
+    guardar_limpias(limpias, reporte_calidad)
+    print(f"✓ Guardado: {ENTRADAS_LIMPIAS_JSON} ({len(limpias)} entradas, reporte en {REPORTE_CALIDAD_JSON})")
+
     # Resumen
     print("\n" + "=" * 60)
     print("RESUMEN FINAL")
@@ -328,7 +303,8 @@ def procesar_introduccion_y_capitulo_a() -> dict:
 
 def validar_extraccion(resultado: dict) -> dict:
     """
-    Valida la calidad de la extracción.
+    Valida la calidad de la extracción. Las entradas del capítulo A pasan por
+    calidad.compactar (modelo Pydantic, duplicados) y se sustituyen por las limpias.
     """
     reporte = {
         "exitosa": False,
@@ -347,16 +323,21 @@ def validar_extraccion(resultado: dict) -> dict:
 
     # Métricas del capítulo A
     if resultado["letra_a"]:
-        num_entradas = resultado["letra_a"]["total_entradas"]
+        limpias, reporte_calidad = compactar(resultado["letra_a"]["entradas"])
+        resultado["letra_a"]["entradas"] = limpias
+        resultado["letra_a"]["total_entradas"] = len(limpias)
+        reporte["calidad"] = reporte_calidad
+
+        num_entradas = len(limpias)
         reporte["metricas"]["entradas_a"] = num_entradas
 
         # Verificar completitud de entradas
-        entradas_completas = sum(
-            1 for e in resultado["letra_a"]["entradas"]
-            if e.get("termino") and e.get("definicion")
-        )
+        entradas_completas = sum(1 for e in limpias if e["definicion"])
         reporte["metricas"]["entradas_completas"] = entradas_completas
 
+        if reporte_calidad["entradas_invalidas"]:
+            reporte["problemas"].append(f"{reporte_calidad['entradas_invalidas']} entradas no válidas")
+
         if num_entradas > 30 and entradas_completas > num_entradas * 0.7:
             reporte["exitosa"] = True
         elif num_entradas > 0:
@@ -0,0 +1,484 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Iterator, List, Optional, Tuple
+os.environ["OLLAMA_HOST"] = os.getenv("OLLAMA_HOST", "http://host.docker.internal:11434")
+from metricas import logger
+from config import *
+
+# ============================================================
+# BACKENDS DE GENERACIÓN
+# ============================================================
+#
+# Cada backend expone generar(mensajes, opciones) -> (texto, metricas) y
+# generar_stream(mensajes, opciones, metricas), que produce fragmentos de
+# texto y al terminar rellena el diccionario metricas. Los mensajes siguen
+# el formato chat (system/user) y las opciones usan el vocabulario de
+# Ollama (temperature, top_p, num_predict, stop), que cada backend traduce
+# al suyo. Los clientes se crean al primer uso para que solo haga falta
+# instalar las librerías de los backends configurados.
+
+class BackendLLM:
+    """Interfaz común de los backends de generación"""
+    nombre = "base"
+
+    def generar(self, mensajes: List[Dict], opciones: Dict = None) -> Tuple[str, Dict]:
+        raise NotImplementedError
+
+    def generar_stream(self, mensajes: List[Dict], opciones: Dict = None, metricas: Dict = None) -> Iterator[str]:
+        texto, resultado = self.generar(mensajes, opciones)
+        if metricas is not None:
+            metricas.update(resultado)
+        yield texto
+
+    def precalentar(self, mensajes: List[Dict]) -> Dict:
+        return {}
+
+
+def metricas_ollama(resp) -> Dict:
+    """
+    Extrae los tiempos (en ms) y recuentos de tokens de una respuesta de Ollama.
+    """
+    metricas = {}
+    for campo in ("total_duration", "load_duration", "prompt_eval_duration", "eval_duration"):
+        metricas[campo.replace("_duration", "_ms")] = round((resp.get(campo) or 0) / 1e6, 1)
+    metricas["prompt_eval_count"] = resp.get("prompt_eval_count") or 0
+    metricas["eval_count"] = resp.get("eval_count") or 0
+    return metricas
+
+
+class BackendOllama(BackendLLM):
+    """Modelo local servido por Ollama"""
+    nombre = "ollama"
+
+    def __init__(self, modelo: str = OLLAMA_MODEL):
+        self.modelo = modelo
+        self.cliente = None
+
+    def obtener_cliente(self):
+        if self.cliente is None:
+            import ollama
+            self.cliente = ollama.Client(timeout=LLM_TIMEOUT)
+        return self.cliente
+
+    def generar(self, mensajes: List[Dict], opciones: Dict = None) -> Tuple[str, Dict]:
+        resp = self.obtener_cliente().chat(
+            model=self.modelo,
+            messages=mensajes,
+            options={**OLLAMA_OPTIONS, **(opciones or {})},
+            keep_alive=OLLAMA_KEEP_ALIVE
+        )
+        return resp["message"]["content"], metricas_ollama(resp)
+
+    def generar_stream(self, mensajes: List[Dict], opciones: Dict = None, metricas: Dict = None) -> Iterator[str]:
+        for parte in self.obtener_cliente().chat(
+                model=self.modelo,
+                messages=mensajes,
+                options={**OLLAMA_OPTIONS, **(opciones or {})},
+                keep_alive=OLLAMA_KEEP_ALIVE,
+                stream=True
+        ):
+            if parte["message"]["content"]:
+                yield parte["message"]["content"]
+            if parte.get("done") and metricas is not None:
+                metricas.update(metricas_ollama(parte))
+
+    def precalentar(self, mensajes: List[Dict]) -> Dict:
+        """
+        Carga el modelo y evalúa el prefijo fijo (instrucciones) para que la
+        primera pregunta no pague la carga ni la evaluación del prefijo.
+        """
+        resp = self.obtener_cliente().chat(
+            model=self.modelo,
+            messages=mensajes,
+            options={**OLLAMA_OPTIONS, "num_predict": 1},
+            keep_alive=OLLAMA_KEEP_ALIVE
+        )
+        return metricas_ollama(resp)
+
+
+class BackendOpenAI(BackendLLM):
+    """API compatible con OpenAI (OpenAI, Gemini, Perplexity)"""
+
+    def __init__(self, nombre: str, modelo: str, api_key_env: str, base_url: str = None):
+        self.nombre = nombre
+        self.modelo = modelo
+        self.api_key_env = api_key_env
+        self.base_url = base_url
+        self.cliente = None
+
+    def obtener_cliente(self):
+        if self.cliente is None:
+            from openai import OpenAI
+            # Sin reintentos del SDK: ante un error decide el enrutador
+            self.cliente = OpenAI(
+                api_key=os.getenv(self.api_key_env),
+                base_url=self.base_url,
+                timeout=LLM_TIMEOUT,
+                max_retries=0
+            )
+        return self.cliente
+
+    def parametros(self, mensajes: List[Dict], opciones: Dict = None) -> Dict:
+        opciones = {**OLLAMA_OPTIONS, **(opciones or {})}
+        parametros = {
+            "model": self.modelo,
+            "messages": mensajes,
+            "temperature": opciones["temperature"],
+            "top_p": opciones["top_p"],
+            "max_tokens": opciones["num_predict"]
+        }
+        if opciones.get("stop"):
+            parametros["stop"] = opciones["stop"]
+        return parametros
+
+    def generar(self, mensajes: List[Dict], opciones: Dict = None) -> Tuple[str, Dict]:
+        resp = self.obtener_cliente().chat.completions.create(**self.parametros(mensajes, opciones))
+        metricas = {}
+        if resp.usage:
+            metricas["prompt_eval_count"] = resp.usage.prompt_tokens
+            metricas["eval_count"] = resp.usage.completion_tokens
+        return resp.choices[0].message.content, metricas
+
+    def generar_stream(self, mensajes: List[Dict], opciones: Dict = None, metricas: Dict = None) -> Iterator[str]:
+        for parte in self.obtener_cliente().chat.completions.create(
+                **self.parametros(mensajes, opciones),
+                stream=True,
+                stream_options={"include_usage": True}
+        ):
+            if parte.choices and parte.choices[0].delta.content:
+                yield parte.choices[0].delta.content
+            if parte.usage and metricas is not None:
+                metricas["prompt_eval_count"] = parte.usage.prompt_tokens
+                metricas["eval_count"] = parte.usage.completion_tokens
+
+
+class BackendAnthropic(BackendLLM):
+    """API de Anthropic"""
+    nombre = "anthropic"
+
+    def __init__(self, modelo: str = ANTHROPIC_MODEL):
+        self.modelo = modelo
+        self.cliente = None
+
+    def obtener_cliente(self):
+        if self.cliente is None:
+            import anthropic
+            # Sin reintentos del SDK: ante un error decide el enrutador
+            self.cliente = anthropic.Anthropic(timeout=LLM_TIMEOUT, max_retries=0)
+        return self.cliente
+
+    def parametros(self, mensajes: List[Dict], opciones: Dict = None) -> Dict:
+        opciones = {**OLLAMA_OPTIONS, **(opciones or {})}
+        sistema = "\n".join(m["content"] for m in mensajes if m["role"] == "system")
+        parametros = {
+            "model": self.modelo,
+            "system": sistema,
+            "messages": [m for m in mensajes if m["role"] != "system"],
+            "temperature": opciones["temperature"],
+            "max_tokens": opciones["num_predict"]
+        }
+        if opciones.get("stop"):
+            parametros["stop_sequences"] = opciones["stop"]
+        return parametros
+
+    def generar_stream(self, mensajes: List[Dict], opciones: Dict = None, metricas: Dict = None) -> Iterator[str]:
+        with self.obtener_cliente().messages.stream(**self.parametros(mensajes, opciones)) as stream:
+            for texto in stream.text_stream:
+                yield texto
+            final = stream.get_final_message()
+        if metricas is not None:
+            metricas["prompt_eval_count"] = final.usage.input_tokens
+            metricas["eval_count"] = final.usage.output_tokens
+
+    def generar(self, mensajes: List[Dict], opciones: Dict = None) -> Tuple[str, Dict]:
+        resp = self.obtener_cliente().messages.create(**self.parametros(mensajes, opciones))
+        metricas = {
+            "prompt_eval_count": resp.usage.input_tokens,
+            "eval_count": resp.usage.output_tokens
+        }
+        return "".join(b.text for b in resp.content if b.type == "text"), metricas
+
+
+class BackendSimulado(BackendLLM):
+    """
+    Backend sin modelo para benchmarks y pruebas de carga: simula la
+    evaluación del prompt y la generación con tiempos fijos por token, de
+    modo que las mediciones extremo a extremo sean reproducibles.
+    """
+    nombre = "simulado"
+
+    def __init__(
+            self,
+            ms_token_prompt: float = SIMULADO_MS_TOKEN_PROMPT,
+            ms_token: float = SIMULADO_MS_TOKEN,
+            tokens_respuesta: int = SIMULADO_TOKENS_RESPUESTA
+    ):
+        self.ms_token_prompt = ms_token_prompt
+        self.ms_token = ms_token
+        self.tokens_respuesta = tokens_respuesta
+
+    def generar(self, mensajes: List[Dict], opciones: Dict = None) -> Tuple[str, Dict]:
+        metricas = {}
+        texto = "".join(self.generar_stream(mensajes, opciones, metricas))
+        return texto, metricas
+
+    def generar_stream(self, mensajes: List[Dict], opciones: Dict = None, metricas: Dict = None) -> Iterator[str]:
+        opciones = {**OLLAMA_OPTIONS, **(opciones or {})}
+        tokens_prompt = int(sum(len(m["content"]) for m in mensajes) / CARACTERES_POR_TOKEN)
+        tokens = min(self.tokens_respuesta, opciones["num_predict"])
+        prompt_ms = tokens_prompt * self.ms_token_prompt
+        eval_ms = tokens * self.ms_token
+
+        time.sleep(prompt_ms / 1000)
+        yield f"Respuesta simulada ({tokens_prompt} tokens de prompt):"
+        for i in range(tokens):
+            time.sleep(self.ms_token / 1000)
+            yield f" t{i}"
+
+        if metricas is not None:
+            metricas.update({
+                "load_ms": 0.0,
+                "prompt_eval_ms": round(prompt_ms, 1),
+                "eval_ms": round(eval_ms, 1),
+                "prompt_eval_count": tokens_prompt,
+                "eval_count": tokens
+            })
+
+
+def crear_backend(nombre: str) -> BackendLLM:
+    """
+    Crea un backend a partir de su nombre en LLM_BACKENDS.
+    """
+    if nombre == "ollama":
+        return BackendOllama()
+    if nombre == "openai":
+        return BackendOpenAI("openai", OPENAI_MODEL, "OPENAI_API_KEY")
+    if nombre == "gemini":
+        return BackendOpenAI(
+            "gemini", GEMINI_MODEL, "GOOGLE_API_KEY",
+            "https://generativelanguage.googleapis.com/v1beta/openai/"
+        )
+    if nombre == "perplexity":
+        return BackendOpenAI("perplexity", PERPLEXITY_MODEL, "PERPLEXITY_API_KEY", "https://api.perplexity.ai")
+    if nombre == "anthropic":
+        return BackendAnthropic()
+    if nombre == "simulado":
+        return BackendSimulado()
+    raise ValueError(f"Backend desconocido: {nombre}")
+
+# ============================================================
+# ENRUTADOR
+# ============================================================
+
+class EstadisticasBackend:
+    """Latencias y errores recientes de un backend (ventana deslizante)"""
+
+    def __init__(self, ventana: int = LLM_VENTANA_LATENCIAS):
+        self.muestras = deque(maxlen=ventana)
+        self.ultimo_error = 0.0
+        self.lock = threading.Lock()
+
+    def registrar(self, latencia: float, ok: bool):
+        with self.lock:
+            self.muestras.append((latencia, ok))
+            if not ok:
+                self.ultimo_error = time.monotonic()
+
+    def percentil(self, p: float) -> Optional[float]:
+        with self.lock:
+            latencias = sorted(l for l, ok in self.muestras if ok)
+        if len(latencias) < LLM_MIN_MUESTRAS:
+            return None
+        return latencias[min(len(latencias) - 1, int(len(latencias) * p / 100))]
+
+    def tasa_error(self) -> float:
+        with self.lock:
+            if not self.muestras:
+                return 0.0
+            return sum(1 for _, ok in self.muestras if not ok) / len(self.muestras)
+
+    def saludable(self) -> bool:
+        """
+        Un backend con demasiados errores recientes se aparta hasta que pasa
+        LLM_ENFRIAMIENTO desde el último error; después se vuelve a probar.
+        """
+        if len(self.muestras) < LLM_MIN_MUESTRAS or self.tasa_error() <= LLM_MAX_TASA_ERROR:
+            return True
+        return time.monotonic() - self.ultimo_error > LLM_ENFRIAMIENTO
+
+    def resumen(self) -> Dict:
+        p50, p95 = self.percentil(50), self.percentil(95)
+        return {
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "tasa_error": round(self.tasa_error(), 3),
+            "muestras": len(self.muestras),
+            "saludable": self.saludable()
+        }
+
+
+class EnrutadorLLM:
+    """
+    Envía cada petición al backend sano más rápido (p50 reciente), pasa al
+    siguiente si falla o supera LLM_TIMEOUT, y si tarda más que su p95 lanza
+    una petición de cobertura en paralelo al siguiente y se queda con la
+    primera respuesta.
+    """
+
+    def __init__(self, backends: List[BackendLLM]):
+        if not backends:
+            raise ValueError("El enrutador necesita al menos un backend")
+        self.backends = backends
+        self.estadisticas = {b.nombre: EstadisticasBackend() for b in backends}
+        self.ejecutor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCIA, thread_name_prefix="llm")
+
+    def ordenar(self) -> List[BackendLLM]:
+        """
+        Backends sanos primero y, entre ellos, por p50 penalizado por la tasa
+        de error. Los que aún no tienen muestras van delante para medirlos.
+        """
+        def clave(backend):
+            est = self.estadisticas[backend.nombre]
+            p50 = est.percentil(50)
+            return (not est.saludable(), (p50 or 0.0) * (1 + est.tasa_error()))
+        return sorted(self.backends, key=clave)
+
+    def registrar_al_terminar(self, futuro, backend: BackendLLM, inicio: float):
+        """
+        Registra el resultado de una petición que ya no se espera (perdió la
+        carrera de cobertura) para que su latencia cuente igualmente.
+        """
+        def registrar(f):
+            self.estadisticas[backend.nombre].registrar(time.monotonic() - inicio, f.exception() is None)
+        futuro.add_done_callback(registrar)
+
+    def generar(self, mensajes: List[Dict], opciones: Dict = None) -> Tuple[str, Dict]:
+        candidatos = self.ordenar()
+        pendientes = {}
+        siguiente = 0
+        cobertura_lanzada = False
+        ultimo_error = None
+
+        def lanzar():
+            nonlocal siguiente
+            backend = candidatos[siguiente]
+            siguiente += 1
+            futuro = self.ejecutor.submit(backend.generar, mensajes, opciones)
+            pendientes[futuro] = (backend, time.monotonic())
+
+        lanzar()
+        while pendientes:
+            ahora = time.monotonic()
+            espera = min(inicio + LLM_TIMEOUT - ahora for _, inicio in pendientes.values())
+
+            limite_cobertura = None
+            if not cobertura_lanzada and siguiente < len(candidatos) and len(pendientes) == 1:
+                backend, inicio = next(iter(pendientes.values()))
+                p95 = self.estadisticas[backend.nombre].percentil(LLM_PERCENTIL_COBERTURA)
+                if p95 is not None:
+                    limite_cobertura = inicio + p95
+                    espera = min(espera, limite_cobertura - ahora)
+
+            hechos, _ = wait(pendientes, timeout=max(espera, 0), return_when=FIRST_COMPLETED)
+
+            for futuro in hechos:
+                backend, inicio = pendientes.pop(futuro)
+                latencia = time.monotonic() - inicio
+                try:
+                    texto, metricas = futuro.result()
+                except Exception as e:
+                    self.estadisticas[backend.nombre].registrar(latencia, False)
+                    logger.warning(f"Backend {backend.nombre} falló: {e}")
+                    ultimo_error = e
+                    continue
+                self.estadisticas[backend.nombre].registrar(latencia, True)
+                for otro, (b, i) in pendientes.items():
+                    self.registrar_al_terminar(otro, b, i)
+                return texto, {**metricas, "backend": backend.nombre, "latencia_ms": round(latencia * 1000, 1)}
+
+            ahora = time.monotonic()
+            for futuro, (backend, inicio) in list(pendientes.items()):
+                if ahora - inicio >= LLM_TIMEOUT:
+                    del pendientes[futuro]
+                    self.estadisticas[backend.nombre].registrar(ahora - inicio, False)
+                    logger.warning(f"Backend {backend.nombre} superó {LLM_TIMEOUT}s")
+                    ultimo_error = TimeoutError(f"{backend.nombre} superó {LLM_TIMEOUT}s")
+
+            if siguiente < len(candidatos):
+                if not pendientes:
+                    lanzar()
+                elif limite_cobertura is not None and ahora >= limite_cobertura:
+                    logger.info(f"Cobertura: {candidatos[siguiente].nombre} en paralelo")
+                    cobertura_lanzada = True
+                    lanzar()
+
+        raise ultimo_error or RuntimeError("No hay backends disponibles")
+
+    def generar_stream(self, mensajes: List[Dict], opciones: Dict = None, metricas: Dict = None) -> Iterator[str]:
+        """
+        Versión en streaming: elige backend igual que generar y pasa al
+        siguiente si falla antes del primer fragmento. Una vez empezada la
+        respuesta no hay cobertura ni cambio de backend.
+        """
+        metricas = {} if metricas is None else metricas
+        ultimo_error = None
+        for backend in self.ordenar():
+            inicio = time.monotonic()
+            fragmentos = backend.generar_stream(mensajes, opciones, metricas)
+            try:
+                primero = next(fragmentos, "")
+            except Exception as e:
+                self.estadisticas[backend.nombre].registrar(time.monotonic() - inicio, False)
+                logger.warning(f"Backend {backend.nombre} falló: {e}")
+                ultimo_error = e
+                continue
+
+            metricas["primer_fragmento_ms"] = round((time.monotonic() - inicio) * 1000, 1)
+            ok = False
+            try:
+                yield primero
+                yield from fragmentos
+                ok = True
+            except GeneratorExit:
+                # El cliente dejó de leer: no es un fallo del backend
+                ok = True
+                raise
+            finally:
+                latencia = time.monotonic() - inicio
+                self.estadisticas[backend.nombre].registrar(latencia, ok)
+                metricas.update({"backend": backend.nombre, "latencia_ms": round(latencia * 1000, 1)})
+            return
+
+        raise ultimo_error or RuntimeError("No hay backends disponibles")
+
+    def precalentar(self, mensajes: List[Dict]) -> Dict:
+        """
+        Precalienta los backends que lo admiten (modelos locales).
+        """
+        resultado = {}
+        for backend in self.backends:
+            try:
+                resultado[backend.nombre] = backend.precalentar(mensajes)
+            except Exception as e:
+                logger.warning(f"No se pudo precalentar {backend.nombre}: {e}")
+        return resultado
+
+    def resumen(self) -> Dict:
+        return {nombre: est.resumen() for nombre, est in self.estadisticas.items()}
+
+
+enrutador = None
+lock_enrutador = threading.Lock()
+
+def obtener_enrutador() -> EnrutadorLLM:
+    """
+    Enrutador compartido, creado al primer uso a partir de LLM_BACKENDS.
+    """
+    global enrutador
+    with lock_enrutador:
+        if enrutador is None:
+            enrutador = EnrutadorLLM([crear_backend(nombre) for nombre in LLM_BACKENDS])
+        return enrutador
@@ -0,0 +1,251 @@
+"""
+Benchmark de búsqueda y extremo a extremo con un conjunto de consultas etiquetadas.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.busqueda --salida resultados.json
+    python -m benchmarks.busqueda --e2e --comparar resultados_anteriores.json
+    python -m benchmarks.busqueda --origen sqlite --comparar resultados.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, List, Dict
+
+import main
+import backends
+from benchmarks.comun import percentiles, commit_actual
+from config import *
+
+RUTA_GOLDEN = os.path.join(os.path.dirname(__file__), "consultas_golden.json")
+
+PLANTILLAS_SINTETICAS = [
+    "{termino}",
+    "¿Qué conflicto tiene {termino}?",
+    "Sentido biológico de {termino}",
+]
+
+# ============================================================
+# CONSULTAS
+# ============================================================
+
+def cargar_golden(ruta: str = RUTA_GOLDEN) -> List[Dict]:
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def generar_sinteticas(entradas: List[Dict], cantidad: int, semilla: int = 42) -> List[Dict]:
+    """
+    Consultas a partir de los términos del diccionario: el propio término y
+    preguntas con plantilla. Se espera recuperar la entrada del término.
+    """
+    azar = random.Random(semilla)
+    terminos = sorted({e["termino"] for e in entradas if e.get("termino")})
+    consultas = []
+    for termino in azar.sample(terminos, min(cantidad, len(terminos))):
+        plantilla = azar.choice(PLANTILLAS_SINTETICAS)
+        consultas.append({
+            "pregunta": plantilla.format(termino=termino),
+            "esperados": [termino],
+            "origen": "sintetica"
+        })
+    return consultas
+
+# ============================================================
+# MEDICIONES
+# ============================================================
+
+def cargador(origen: str) -> Callable[[], Dict]:
+    """
+    Carga del diccionario en memoria (json) o abierto en disco (sqlite).
+    """
+    if origen == "sqlite":
+        from diccionario_sqlite import abrir_diccionario
+        return lambda: abrir_diccionario(DICCIONARIO_SQLITE)
+    return main.cargar_diccionario
+
+def medir_indice(repeticiones: int, cargar: Callable[[], Dict] = main.cargar_diccionario) -> Dict:
+    """
+    Tiempo de construcción del índice (cargar_diccionario) y memoria que ocupa.
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cargar()
+        tiempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    datos = cargar()
+    actual, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "construccion": percentiles(tiempos),
+        "memoria_indice_mb": round(actual / 1024 / 1024, 2),
+        "memoria_pico_mb": round(pico / 1024 / 1024, 2),
+        "entradas": datos["total"],
+        "pasajes": datos.get("total_pasajes", 0)
+    }
+
+def recall_en_k(encontrados: List[str], esperados: List[str], k: int) -> float:
+    top = set(encontrados[:k])
+    return sum(1 for e in esperados if e in top) / len(esperados)
+
+def medir_busqueda(consultas: List[Dict], datos: Dict, iteraciones: int, k: int) -> Dict:
+    """
+    Latencia de buscar_entradas por consulta, consultas/segundo y recall@k.
+    La primera pasada (cachés frías) se mide aparte.
+    """
+    main.normalizar.cache_clear()
+    main.limpiar_texto.cache_clear()
+
+    inicio = time.perf_counter()
+    for c in consultas:
+        main.buscar_entradas(c["pregunta"], datos, k)
+    primera_pasada = time.perf_counter() - inicio
+
+    latencias = []
+    inicio_total = time.perf_counter()
+    for _ in range(iteraciones):
+        for c in consultas:
+            inicio = time.perf_counter()
+            main.buscar_entradas(c["pregunta"], datos, k)
+            latencias.append(time.perf_counter() - inicio)
+    total = time.perf_counter() - inicio_total
+
+    recall_por_origen = {}
+    fallos = []
+    for c in consultas:
+        encontrados = [e.get("termino") for e in main.buscar_entradas(c["pregunta"], datos, k)]
+        r = recall_en_k(encontrados, c["esperados"], k)
+        recall_por_origen.setdefault(c.get("origen", "?"), []).append(r)
+        if r < 1:
+            fallos.append({"pregunta": c["pregunta"], "esperados": c["esperados"], "encontrados": encontrados})
+
+    return {
+        "consultas": len(consultas),
+        "iteraciones": iteraciones,
+        "primera_pasada_ms": round(primera_pasada * 1000, 3),
+        "latencia": percentiles(latencias),
+        "consultas_por_segundo": round(len(latencias) / total, 1) if total else None,
+        f"recall_en_{k}": {
+            origen: round(statistics.mean(valores), 4)
+            for origen, valores in sorted(recall_por_origen.items())
+        },
+        "fallos": fallos
+    }
+
+def medir_extremo_a_extremo(consultas: List[Dict], datos: Dict) -> Dict:
+    """
+    responder_pregunta completo con el backend simulado, para que los tiempos
+    de generación sean deterministas y comparables entre ejecuciones, y sin
+    respuestas precalculadas (dependen de lo que haya en el almacén).
+    """
+    backends.enrutador = backends.EnrutadorLLM([backends.BackendSimulado()])
+    latencias = []
+    tokens = []
+    for c in consultas:
+        inicio = time.perf_counter()
+        resultado = main.responder_pregunta(c["pregunta"], datos, usar_precalculadas=False)
+        latencias.append(time.perf_counter() - inicio)
+        if resultado.get("tokens_contexto"):
+            tokens.append(resultado["tokens_contexto"])
+    return {
+        "latencia": percentiles(latencias),
+        "tokens_contexto_medio": round(statistics.mean(tokens), 1) if tokens else None,
+        "backend": {
+            "ms_token_prompt": SIMULADO_MS_TOKEN_PROMPT,
+            "ms_token": SIMULADO_MS_TOKEN,
+            "tokens_respuesta": SIMULADO_TOKENS_RESPUESTA
+        }
+    }
+
+# ============================================================
+# RESULTADOS
+# ============================================================
+
+def comparar(actual: Dict, anterior: Dict):
+    """
+    Muestra la variación de las métricas principales respecto a otra ejecución.
+    """
+    def valor(resultado, ruta):
+        for clave in ruta:
+            if not isinstance(resultado, dict) or clave not in resultado:
+                return None
+            resultado = resultado[clave]
+        return resultado
+
+    rutas = [
+        ("indice", "construccion", "p50_ms"),
+        ("indice", "memoria_indice_mb"),
+        ("busqueda", "latencia", "p50_ms"),
+        ("busqueda", "latencia", "p95_ms"),
+        ("busqueda", "latencia", "p99_ms"),
+        ("busqueda", "consultas_por_segundo"),
+        ("extremo_a_extremo", "latencia", "p50_ms"),
+        ("extremo_a_extremo", "tokens_contexto_medio"),
+    ]
+    rutas += [("busqueda", clave, origen)
+              for clave in actual["busqueda"] if clave.startswith("recall_en_")
+              for origen in actual["busqueda"][clave]]
+
+    print(f"\nComparación con {anterior.get('commit', '?')} ({anterior.get('fecha', '?')}):")
+    for ruta in rutas:
+        a, b = valor(actual, ruta), valor(anterior, ruta)
+        if a is None or b is None:
+            continue
+        cambio = f"{(a - b) / b * 100:+.1f}%" if b else "n/a"
+        print(f"  {'.'.join(ruta):45s} {b:>10} → {a:>10}  ({cambio})")
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Benchmark de búsqueda del diccionario")
+    parser.add_argument("--iteraciones", type=int, default=5)
+    parser.add_argument("--sinteticas", type=int, default=200, help="consultas generadas a partir de términos")
+    parser.add_argument("--k", type=int, default=MAX_ENTRADAS_RELEVANTES)
+    parser.add_argument("--repeticiones-indice", type=int, default=3)
+    parser.add_argument("--e2e", action="store_true", help="medir también responder_pregunta con el backend simulado")
+    parser.add_argument("--origen", choices=["json", "sqlite"], default="json",
+                        help="diccionario en memoria o en SQLite (python diccionario_sqlite.py)")
+    parser.add_argument("--salida", help="guardar los resultados en este JSON")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior")
+    args = parser.parse_args()
+
+    main.configurar_logging("WARNING")
+
+    cargar = cargador(args.origen)
+    datos = cargar()
+    consultas = cargar_golden() + generar_sinteticas(datos["entradas"], args.sinteticas)
+
+    resultado = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit_actual(),
+        "python": platform.python_version(),
+        "origen": args.origen,
+        "indice": medir_indice(args.repeticiones_indice, cargar),
+        "busqueda": medir_busqueda(consultas, datos, args.iteraciones, args.k),
+    }
+    if args.e2e:
+        resultado["extremo_a_extremo"] = medir_extremo_a_extremo(cargar_golden(), datos)
+
+    resumen = dict(resultado)
+    resumen["busqueda"] = {k: v for k, v in resultado["busqueda"].items() if k != "fallos"}
+    print(json.dumps(resumen, ensure_ascii=False, indent=2))
+    print(f"Consultas con recall incompleto: {len(resultado['busqueda']['fallos'])}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+        print(f"✓ Guardado: {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            comparar(resultado, json.load(f))
+
+
+if __name__ == "__main__":
+    sys.exit(main_benchmark())
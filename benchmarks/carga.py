@@ -0,0 +1,210 @@
+"""
+Generador de carga para la API HTTP del chat (python main.py --api).
+
+Reproduce una mezcla de consultas con la concurrencia indicada y mide
+rendimiento (peticiones/s) y latencias de cola. Con --lanzar arranca el
+servidor con el backend simulado para medir solo el coste del servicio.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.carga --lanzar --concurrencia 16 --duracion 30
+    python -m benchmarks.carga --url http://localhost:7860 --stream --mezcla mezcla.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict
+from urllib.parse import urlparse
+
+from benchmarks.comun import percentiles, commit_actual
+
+RUTA_GOLDEN = os.path.join(os.path.dirname(__file__), "consultas_golden.json")
+
+# ============================================================
+# MEZCLA DE CONSULTAS
+# ============================================================
+
+def cargar_mezcla(ruta: str = None) -> List[Dict]:
+    """
+    Lista de {"pregunta", "peso"}. Por defecto, las consultas etiquetadas
+    del benchmark de búsqueda con el mismo peso.
+    """
+    with open(ruta or RUTA_GOLDEN, 'r', encoding='utf-8') as f:
+        consultas = json.load(f)
+    return [{"pregunta": c["pregunta"], "peso": c.get("peso", 1)} for c in consultas]
+
+# ============================================================
+# CLIENTE
+# ============================================================
+
+def enviar(conexion: http.client.HTTPConnection, pregunta: str, stream: bool) -> Dict:
+    """
+    Envía una pregunta y devuelve estado, latencia total y, en streaming,
+    el tiempo hasta el primer fragmento de la respuesta.
+    """
+    ruta = "/api/preguntar/stream" if stream else "/api/preguntar"
+    cuerpo = json.dumps({"pregunta": pregunta}).encode("utf-8")
+    inicio = time.perf_counter()
+    conexion.request("POST", ruta, body=cuerpo, headers={"Content-Type": "application/json"})
+    resp = conexion.getresponse()
+
+    primer_fragmento = None
+    if stream and resp.status == 200:
+        while primer_fragmento is None:
+            linea = resp.readline()
+            if not linea:
+                break
+            if b'"fragmento"' in linea:
+                primer_fragmento = time.perf_counter() - inicio
+    resp.read()
+
+    return {
+        "estado": resp.status,
+        "latencia": time.perf_counter() - inicio,
+        "primer_fragmento": primer_fragmento
+    }
+
+def trabajador(url, mezcla: List[Dict], stream: bool, fin: float, restantes: Dict, lock, semilla: int) -> List[Dict]:
+    """
+    Bucle de un cliente: una conexión persistente y peticiones seguidas hasta
+    agotar la duración o el número de peticiones.
+    """
+    azar = random.Random(semilla)
+    pesos = [c["peso"] for c in mezcla]
+    resultados = []
+    conexion = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=300)
+
+    while time.perf_counter() < fin:
+        with lock:
+            if restantes["n"] is not None:
+                if restantes["n"] <= 0:
+                    break
+                restantes["n"] -= 1
+
+        pregunta = azar.choices(mezcla, weights=pesos)[0]["pregunta"]
+        try:
+            resultados.append(enviar(conexion, pregunta, stream))
+        except Exception as e:
+            resultados.append({"estado": type(e).__name__, "latencia": None, "primer_fragmento": None})
+            conexion.close()
+            conexion = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=300)
+
+    conexion.close()
+    return resultados
+
+def ejecutar_carga(url: str, mezcla: List[Dict], concurrencia: int, duracion: float,
+                   peticiones: int = None, stream: bool = False) -> Dict:
+    url = urlparse(url)
+    restantes = {"n": peticiones}
+    lock = threading.Lock()
+
+    inicio = time.perf_counter()
+    fin = inicio + duracion
+    with ThreadPoolExecutor(max_workers=concurrencia) as ejecutor:
+        futuros = [
+            ejecutor.submit(trabajador, url, mezcla, stream, fin, restantes, lock, i)
+            for i in range(concurrencia)
+        ]
+        resultados = [r for f in futuros for r in f.result()]
+    total = time.perf_counter() - inicio
+
+    correctos = [r for r in resultados if r["estado"] == 200]
+    estados = {}
+    for r in resultados:
+        estados[str(r["estado"])] = estados.get(str(r["estado"]), 0) + 1
+
+    informe = {
+        "peticiones": len(resultados),
+        "errores": len(resultados) - len(correctos),
+        "estados": estados,
+        "duracion_s": round(total, 2),
+        "peticiones_por_segundo": round(len(correctos) / total, 2) if total else None,
+        "latencia": percentiles([r["latencia"] for r in correctos]),
+    }
+    if stream:
+        informe["primer_fragmento"] = percentiles(
+            [r["primer_fragmento"] for r in correctos if r["primer_fragmento"] is not None]
+        )
+    return informe
+
+# ============================================================
+# SERVIDOR DE PRUEBA
+# ============================================================
+
+def lanzar_servidor(url: str, espera: float = 120) -> subprocess.Popen:
+    """
+    Arranca main.py --api con el backend simulado y espera a que responda.
+    """
+    puerto = urlparse(url).port or 80
+    entorno = {
+        **os.environ,
+        "LLM_BACKENDS": "simulado",
+        "GRADIO_SERVER_PORT": str(puerto),
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+    }
+    proceso = subprocess.Popen([sys.executable, "main.py", "--api"], env=entorno)
+
+    limite = time.time() + espera
+    while time.time() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f"El servidor terminó con código {proceso.returncode}")
+        try:
+            conexion = http.client.HTTPConnection(urlparse(url).hostname, puerto, timeout=2)
+            conexion.request("GET", "/api/salud")
+            if conexion.getresponse().status == 200:
+                return proceso
+        except OSError:
+            pass
+        time.sleep(0.5)
+
+    proceso.terminate()
+    raise RuntimeError("El servidor no respondió a tiempo")
+
+def main_carga():
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API del chat")
+    parser.add_argument("--url", default="http://127.0.0.1:7860")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--duracion", type=float, default=30, help="segundos")
+    parser.add_argument("--peticiones", type=int, help="detener tras este número de peticiones")
+    parser.add_argument("--stream", action="store_true", help="usar /api/preguntar/stream")
+    parser.add_argument("--mezcla", help="JSON con [{'pregunta', 'peso'}]")
+    parser.add_argument("--lanzar", action="store_true", help="arrancar el servidor con el backend simulado")
+    parser.add_argument("--salida", help="guardar el informe en este JSON")
+    args = parser.parse_args()
+
+    proceso = lanzar_servidor(args.url) if args.lanzar else None
+    try:
+        informe = ejecutar_carga(
+            args.url, cargar_mezcla(args.mezcla), args.concurrencia,
+            args.duracion, args.peticiones, args.stream
+        )
+    finally:
+        if proceso:
+            proceso.terminate()
+            proceso.wait()
+
+    informe = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit_actual(),
+        "url": args.url,
+        "concurrencia": args.concurrencia,
+        "stream": args.stream,
+        **informe
+    }
+    print(json.dumps(informe, ensure_ascii=False, indent=2))
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(informe, f, ensure_ascii=False, indent=2)
+        print(f"✓ Guardado: {args.salida}")
+
+
+if __name__ == "__main__":
+    sys.exit(main_carga())
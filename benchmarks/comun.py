@@ -0,0 +1,33 @@
+import statistics
+import subprocess
+from typing import List, Dict
+
+# ============================================================
+# UTILIDADES COMUNES DE LOS BENCHMARKS
+# ============================================================
+
+def percentiles(valores: List[float]) -> Dict:
+    """
+    p50/p90/p95/p99 y máximo en milisegundos.
+    """
+    if not valores:
+        return {}
+    ordenados = sorted(valores)
+
+    def p(q):
+        return round(ordenados[min(len(ordenados) - 1, int(len(ordenados) * q / 100))] * 1000, 3)
+
+    return {
+        "p50_ms": p(50), "p90_ms": p(90), "p95_ms": p(95), "p99_ms": p(99),
+        "max_ms": round(ordenados[-1] * 1000, 3),
+        "media_ms": round(statistics.mean(ordenados) * 1000, 3)
+    }
+
+def commit_actual() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "desconocido"
@@ -0,0 +1,145 @@
+"""
+Tiempo de arranque en frío: importar config y main, y lo que cuesta cada
+camino (normalizar, cargar el diccionario, crear la interfaz Gradio).
+
+Cada medición es un intérprete nuevo, así que no hay módulos en caché. Con
+--limite-ms el proceso termina con error si importar main supera el límite
+(para usarlo en CI y que el arranque no vuelva a crecer sin darnos cuenta).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.tiempo_importacion --repeticiones 10
+    python -m benchmarks.tiempo_importacion --interfaz --limite-ms 300 --salida importacion.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from benchmarks.comun import percentiles, commit_actual
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ESCENARIOS = {
+    "config": "import config",
+    "main": "import main",
+    "normalizar": "from normalizacion import normalizar; normalizar('Alergía')",
+    "diccionario": "import main; main.obtener_diccionario()",
+}
+ESCENARIO_INTERFAZ = ("interfaz", "import main; main.crear_interfaz()")
+
+# Módulos pesados que no deberían cargarse al importar main
+MODULOS_PESADOS = ["gradio", "ollama", "openai", "anthropic", "fastapi", "uvicorn"]
+
+# ============================================================
+# MEDICIONES
+# ============================================================
+
+def ejecutar(codigo: str, importtime: bool = False) -> Tuple[float, str]:
+    """
+    Ejecuta el código en un intérprete nuevo y devuelve el tiempo total y,
+    con importtime, la salida de -X importtime.
+    """
+    argumentos = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", codigo]
+    entorno = {**os.environ, "LOG_LEVEL": "WARNING"}
+    inicio = time.perf_counter()
+    proceso = subprocess.run(argumentos, cwd=RAIZ, env=entorno, capture_output=True, text=True)
+    duracion = time.perf_counter() - inicio
+    if proceso.returncode != 0:
+        raise RuntimeError(f"'{codigo}' terminó con código {proceso.returncode}:\n{proceso.stderr[-2000:]}")
+    return duracion, proceso.stderr
+
+def modulos_mas_lentos(salida_importtime: str, modulo: str, cantidad: int) -> List[Dict]:
+    """
+    Módulos que importa directamente `modulo`, por tiempo acumulado.
+    Formato de cada línea: 'import time: propio | acumulado | módulo', con
+    dos espacios más de sangría por cada nivel de dependencia. Cada módulo
+    aparece después de sus dependencias, así que sus hijos directos son las
+    líneas un nivel más hondas justo antes de la suya; lo que carga el propio
+    intérprete al arrancar (encodings, os, site...) queda fuera.
+    """
+    lineas = []
+    for linea in salida_importtime.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        _, acumulado, nombre = linea[len("import time:"):].split("|")
+        nivel = (len(nombre) - len(nombre.lstrip()) - 1) // 2
+        lineas.append((nivel, nombre.strip(), int(acumulado)))
+
+    posicion = next((i for i, l in enumerate(lineas) if l[1] == modulo), None)
+    if posicion is None:
+        return []
+    nivel_modulo = lineas[posicion][0]
+    modulos = []
+    for nivel, nombre, acumulado in reversed(lineas[:posicion]):
+        if nivel <= nivel_modulo:
+            break
+        if nivel == nivel_modulo + 1:
+            modulos.append({"modulo": nombre, "acumulado_ms": round(acumulado / 1000, 1)})
+    return sorted(modulos, key=lambda m: -m["acumulado_ms"])[:cantidad]
+
+def modulos_cargados(codigo: str) -> List[str]:
+    """
+    Cuáles de MODULOS_PESADOS quedan en sys.modules tras ejecutar el código.
+    """
+    comprobacion = f"{codigo}; import sys; print(','.join(m for m in {MODULOS_PESADOS!r} if m in sys.modules))"
+    proceso = subprocess.run(
+        [sys.executable, "-c", comprobacion], cwd=RAIZ,
+        env={**os.environ, "LOG_LEVEL": "WARNING"}, capture_output=True, text=True
+    )
+    return [m for m in proceso.stdout.strip().split(",") if m]
+
+def medir_escenarios(escenarios: Dict[str, str], repeticiones: int) -> Dict:
+    resultados = {}
+    for nombre, codigo in escenarios.items():
+        tiempos = [ejecutar(codigo)[0] for _ in range(repeticiones)]
+        resultados[nombre] = percentiles(tiempos)
+    return resultados
+
+def main_tiempo_importacion():
+    parser = argparse.ArgumentParser(description="Tiempo de arranque en frío")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--interfaz", action="store_true", help="medir también crear_interfaz (requiere gradio)")
+    parser.add_argument("--top", type=int, default=10, help="módulos más lentos a mostrar")
+    parser.add_argument("--limite-ms", type=float, help="fallar si la mediana de 'import main' lo supera")
+    parser.add_argument("--salida", help="guardar los resultados en este JSON")
+    args = parser.parse_args()
+
+    escenarios = dict(ESCENARIOS)
+    if args.interfaz:
+        escenarios[ESCENARIO_INTERFAZ[0]] = ESCENARIO_INTERFAZ[1]
+
+    # Intérprete vacío: referencia de lo que cuesta arrancar Python
+    escenarios = {"python": "pass", **escenarios}
+
+    _, importtime = ejecutar(ESCENARIOS["main"], importtime=True)
+    resultado = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit_actual(),
+        "python": sys.version.split()[0],
+        "repeticiones": args.repeticiones,
+        "escenarios": medir_escenarios(escenarios, args.repeticiones),
+        "modulos_mas_lentos_main": modulos_mas_lentos(importtime, "main", args.top),
+        "pesados_al_importar_main": modulos_cargados(ESCENARIOS["main"]),
+    }
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+        print(f"✓ Guardado: {args.salida}")
+
+    if args.limite_ms is not None:
+        mediana = resultado["escenarios"]["main"]["p50_ms"]
+        if mediana > args.limite_ms:
+            print(f"✗ import main: {mediana} ms > límite {args.limite_ms} ms")
+            return 1
+        print(f"✓ import main: {mediana} ms ≤ límite {args.limite_ms} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_tiempo_importacion())
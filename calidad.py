@@ -0,0 +1,349 @@
+import argparse
+import json
+import os
+import re
+import time
+import unicodedata
+import zlib
+from difflib import SequenceMatcher
+from itertools import combinations
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+from pydantic import TypeAdapter, ValidationError
+
+from normalizacion import normalizar
+from modelos import EntradaDiccionario
+from config import *
+
+# ============================================================
+# CALIDAD DE LA EXTRACCIÓN: VALIDACIÓN Y COMPACTACIÓN
+# ============================================================
+#
+# La extracción por chunks deja entradas repetidas (la misma entrada leída en
+# dos chunks consecutivos), entradas partidas en la frontera de un chunk y
+# referencias cruzadas escritas con otra grafía que el término al que apuntan.
+# Esta etapa valida todas las entradas con el modelo Pydantic, fusiona los
+# duplicados exactos y los casi duplicados (MinHash) y genera un JSON limpio
+# junto con un reporte de calidad.
+#
+# Uso: python calidad.py [entrada.json] [--salida entradas_limpias.json]
+
+CAMPOS_TEXTO = ["definicion", "tecnico", "sentido_biologico", "conflicto"]
+
+FIN_DE_CAMPO = re.compile(r"[.!?…)»\"”]\s*$")
+
+# ============================================================
+# VALIDACIÓN
+# ============================================================
+
+adaptador_entradas = TypeAdapter(List[EntradaDiccionario])
+
+def validar_entradas(entradas: List) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Valida todas las entradas en una sola llamada al modelo. Devuelve las
+    válidas (como dict) y los errores de las rechazadas con su posición.
+    """
+    try:
+        modelos = adaptador_entradas.validate_python(entradas)
+        errores = []
+    except ValidationError as e:
+        por_posicion = {}
+        for error in e.errors():
+            posicion, *campo = error["loc"]
+            por_posicion.setdefault(posicion, []).append(
+                f"{'.'.join(map(str, campo)) or 'entrada'}: {error['msg']}"
+            )
+        errores = [
+            {
+                "posicion": posicion,
+                "termino": entradas[posicion].get("termino") if isinstance(entradas[posicion], dict) else None,
+                "errores": mensajes
+            }
+            for posicion, mensajes in sorted(por_posicion.items())
+        ]
+        modelos = adaptador_entradas.validate_python(
+            [e for i, e in enumerate(entradas) if i not in por_posicion]
+        )
+
+    return [m.model_dump(exclude_none=True) for m in modelos], errores
+
+def campos_cortados(entrada: Dict) -> List[str]:
+    """
+    Campos que no terminan en fin de frase: probablemente cortados por el chunk.
+    """
+    return [
+        campo for campo in CAMPOS_TEXTO
+        if len(entrada[campo]) > 40 and not FIN_DE_CAMPO.search(entrada[campo])
+    ]
+
+# ============================================================
+# FUSIÓN DE ENTRADAS
+# ============================================================
+
+def compactar_espacios(texto: str) -> str:
+    return re.sub(r"\s+", " ", texto).strip()
+
+def clave_duplicado(termino: str) -> str:
+    """
+    Término sin mayúsculas ni tildes. A diferencia de normalizar conserva
+    números y signos: '1ª ETAPA' y '2ª ETAPA' son entradas distintas.
+    """
+    texto = unicodedata.normalize("NFD", termino.casefold())
+    texto = "".join(c for c in texto if unicodedata.category(c) != "Mn")
+    return compactar_espacios(texto)
+
+def fusionar_texto(a: str, b: str) -> str:
+    """
+    Une dos versiones de un campo: si una contiene a la otra (o son casi
+    iguales, p. ej. con una errata) se queda la más completa; si no, son dos
+    trozos de la misma entrada partida y se concatenan.
+    """
+    if not b:
+        return a
+    if not a:
+        return b
+    a_norm, b_norm = normalizar(a), normalizar(b)
+    if b_norm in a_norm:
+        return a
+    if a_norm in b_norm:
+        return b
+    if SequenceMatcher(None, a_norm, b_norm).ratio() >= UMBRAL_CASI_DUPLICADO:
+        return a if len(a) >= len(b) else b
+    return f"{a} {b}"
+
+def fusionar_entradas(principal: Dict, otra: Dict) -> Dict:
+    fusionada = dict(principal)
+    for campo in CAMPOS_TEXTO:
+        fusionada[campo] = fusionar_texto(principal[campo], otra[campo])
+    # Las referencias se comparan como los términos (sin mayúsculas ni tildes)
+    referencias = {}
+    for referencia in principal["referencias_cruzadas"] + otra["referencias_cruzadas"]:
+        referencias.setdefault(clave_duplicado(referencia), referencia)
+    fusionada["referencias_cruzadas"] = list(referencias.values())
+    return fusionada
+
+def deduplicar_exactos(entradas: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Fusiona las entradas con el mismo término (sin mayúsculas ni tildes) en
+    la posición de la primera aparición.
+    """
+    por_clave: Dict[str, int] = {}
+    resultado, grupos = [], {}
+    for entrada in entradas:
+        clave = clave_duplicado(entrada["termino"])
+        if clave in por_clave:
+            posicion = por_clave[clave]
+            resultado[posicion] = fusionar_entradas(resultado[posicion], entrada)
+            grupos.setdefault(clave, [resultado[posicion]["termino"]]).append(entrada["termino"])
+        else:
+            por_clave[clave] = len(resultado)
+            resultado.append(entrada)
+    return resultado, [{"clave": c, "terminos": t} for c, t in grupos.items()]
+
+# ============================================================
+# CASI DUPLICADOS (MINHASH)
+# ============================================================
+
+def tejas(texto_norm: str, palabras: int = SHINGLE_PALABRAS) -> Set[str]:
+    """
+    Shingles de palabras consecutivas del texto normalizado.
+    """
+    lista = texto_norm.split()
+    if len(lista) < palabras:
+        return {texto_norm} if texto_norm else set()
+    return {" ".join(lista[i:i + palabras]) for i in range(len(lista) - palabras + 1)}
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+def firmas_minhash(conjuntos: List[Set[str]], permutaciones: int = MINHASH_PERMUTACIONES) -> np.ndarray:
+    """
+    Firma MinHash de cada conjunto con hashing multiply-shift sobre el crc32
+    de cada shingle: una fila de 'permutaciones' mínimos por conjunto.
+    """
+    azar = np.random.default_rng(0)
+    a = azar.integers(1, 2 ** 63, permutaciones, dtype=np.uint64) | np.uint64(1)
+    b = azar.integers(0, 2 ** 63, permutaciones, dtype=np.uint64)
+    firmas = np.full((len(conjuntos), permutaciones), np.iinfo(np.uint32).max, dtype=np.uint64)
+    for i, conjunto in enumerate(conjuntos):
+        if not conjunto:
+            continue
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in conjunto), dtype=np.uint64, count=len(conjunto))
+        firmas[i] = ((hashes[:, None] * a + b) >> np.uint64(32)).min(axis=0)
+    return firmas
+
+def casi_duplicados(entradas: List[Dict], umbral: float = UMBRAL_CASI_DUPLICADO) -> List[Tuple[int, int, float]]:
+    """
+    Pares de entradas con contenido casi igual. LSH por bandas de la firma
+    para obtener candidatos y Jaccard exacto para confirmarlos. Las entradas
+    con muy poco texto (las de solo referencias) no se comparan.
+    """
+    conjuntos = [
+        tejas(normalizar(" ".join(e[c] for c in CAMPOS_TEXTO)))
+        for e in entradas
+    ]
+    conjuntos = [c if len(c) >= MIN_SHINGLES_COMPARACION else set() for c in conjuntos]
+    firmas = firmas_minhash(conjuntos)
+    filas = MINHASH_PERMUTACIONES // MINHASH_BANDAS
+
+    candidatos = set()
+    for banda in range(MINHASH_BANDAS):
+        cubetas = {}
+        for i, conjunto in enumerate(conjuntos):
+            if conjunto:
+                cubetas.setdefault(firmas[i, banda * filas:(banda + 1) * filas].tobytes(), []).append(i)
+        for grupo in cubetas.values():
+            candidatos.update(combinations(grupo, 2))
+
+    pares = []
+    for i, j in sorted(candidatos):
+        similitud = jaccard(conjuntos[i], conjuntos[j])
+        if similitud >= umbral:
+            pares.append((i, j, round(similitud, 3)))
+    return pares
+
+def longitud_texto(entrada: Dict) -> int:
+    return sum(len(entrada[c]) for c in CAMPOS_TEXTO)
+
+def resolver_casi_duplicados(
+        entradas: List[Dict],
+        pares: List[Tuple[int, int, float]]
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    De cada par se conserva la entrada con más texto (con lo que aporte la
+    otra) y la otra pasa a ser una entrada de referencia hacia ella, como las
+    'Ver:' del diccionario: el término se sigue encontrando sin repetir texto.
+    """
+    resultado = list(entradas)
+    informe = []
+    for i, j, similitud in pares:
+        principal, secundaria = (i, j) if longitud_texto(resultado[i]) >= longitud_texto(resultado[j]) else (j, i)
+        if not any(resultado[secundaria][c] for c in CAMPOS_TEXTO):
+            continue  # ya convertida por otro par
+        resultado[principal] = fusionar_entradas(resultado[principal], resultado[secundaria])
+        resultado[secundaria] = {
+            **resultado[secundaria],
+            **{c: "" for c in CAMPOS_TEXTO},
+            "referencias_cruzadas": [resultado[principal]["termino"]]
+        }
+        informe.append({
+            "termino": resultado[secundaria]["termino"],
+            "remite_a": resultado[principal]["termino"],
+            "similitud": similitud
+        })
+    return resultado, informe
+
+# ============================================================
+# COMPACTACIÓN
+# ============================================================
+
+def resolver_referencias(entradas: List[Dict]) -> Dict:
+    """
+    Escribe cada referencia cruzada con la grafía exacta del término al que
+    apunta (para que coincida en búsquedas y popularidad), sin repetidas ni
+    autorreferencias, y quita las que no existen si son una errata de otra
+    de la misma entrada que sí existe. Devuelve cuántas se corrigieron,
+    cuáles se descartaron como erratas y cuáles no existen.
+    """
+    terminos = {clave_duplicado(e["termino"]): e["termino"] for e in entradas}
+    corregidas, erratas, sin_destino = 0, set(), set()
+    for entrada in entradas:
+        propia = clave_duplicado(entrada["termino"])
+        referencias: Dict[str, str] = {}
+        for referencia in entrada["referencias_cruzadas"]:
+            clave = clave_duplicado(referencia)
+            if not clave or clave == propia or clave in referencias:
+                continue
+            destino = terminos.get(clave, referencia)
+            if clave in terminos and destino != referencia:
+                corregidas += 1
+            referencias[clave] = destino
+
+        resueltas = [c for c in referencias if c in terminos]
+        for clave in [c for c in referencias if c not in terminos]:
+            if any(SequenceMatcher(None, clave, otra).ratio() >= UMBRAL_ERRATA_REFERENCIA for otra in resueltas):
+                erratas.add(referencias.pop(clave))
+            else:
+                sin_destino.add(referencias[clave])
+        entrada["referencias_cruzadas"] = list(referencias.values())
+    return {"corregidas": corregidas, "erratas": sorted(erratas), "sin_destino": sorted(sin_destino)}
+
+def compactar(entradas: List) -> Tuple[List[Dict], Dict]:
+    """
+    Validación, limpieza y fusión de duplicados. Devuelve las entradas
+    limpias y el reporte de calidad.
+    """
+    inicio = time.perf_counter()
+    validas, errores = validar_entradas(entradas)
+
+    for entrada in validas:
+        entrada["termino"] = compactar_espacios(entrada["termino"])
+        for campo in CAMPOS_TEXTO:
+            entrada[campo] = compactar_espacios(entrada[campo])
+        entrada["referencias_cruzadas"] = [compactar_espacios(r) for r in entrada["referencias_cruzadas"]]
+
+    sin_duplicados, duplicados = deduplicar_exactos(validas)
+    pares = casi_duplicados(sin_duplicados)
+    limpias, remitidas = resolver_casi_duplicados(sin_duplicados, pares)
+    referencias = resolver_referencias(limpias)
+
+    cortadas = [
+        {"termino": e["termino"], "campos": campos}
+        for e in limpias if (campos := campos_cortados(e))
+    ]
+    solo_referencias = sum(1 for e in limpias if not any(e[c] for c in CAMPOS_TEXTO))
+
+    reporte = {
+        "entradas_originales": len(entradas),
+        "entradas_invalidas": len(errores),
+        "entradas_limpias": len(limpias),
+        "duplicados_exactos": duplicados,
+        "casi_duplicados": remitidas,
+        "entradas_solo_referencias": solo_referencias,
+        "campos_posiblemente_cortados": cortadas,
+        "referencias_corregidas": referencias["corregidas"],
+        "referencias_erratas": referencias["erratas"],
+        "referencias_sin_destino": referencias["sin_destino"],
+        "errores_validacion": errores,
+        "duracion_s": round(time.perf_counter() - inicio, 3)
+    }
+    return limpias, reporte
+
+def guardar_limpias(
+        limpias: List[Dict],
+        reporte: Dict,
+        salida: str = ENTRADAS_LIMPIAS_JSON,
+        ruta_reporte: str = REPORTE_CALIDAD_JSON
+):
+    # Sin sangría: el artefacto es para cargar, no para leer
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump(limpias, f, ensure_ascii=False, separators=(",", ":"))
+    reporte["bytes_limpios"] = os.path.getsize(salida)
+
+    with open(ruta_reporte, 'w', encoding='utf-8') as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+
+def main_calidad():
+    parser = argparse.ArgumentParser(description="Valida y compacta las entradas extraídas")
+    parser.add_argument("entrada", nargs="?", default=SALIDA_ENTRADAS_COMPLETO)
+    parser.add_argument("--salida", default=ENTRADAS_LIMPIAS_JSON)
+    parser.add_argument("--reporte", default=REPORTE_CALIDAD_JSON)
+    args = parser.parse_args()
+
+    with open(args.entrada, 'r', encoding='utf-8') as f:
+        entradas = json.load(f)
+
+    limpias, reporte = compactar(entradas)
+    reporte["bytes_originales"] = os.path.getsize(args.entrada)
+    guardar_limpias(limpias, reporte, args.salida, args.reporte)
+
+    print(f"✓ {reporte['entradas_originales']} → {reporte['entradas_limpias']} entradas "
+          f"({reporte['entradas_invalidas']} inválidas, {len(reporte['duplicados_exactos'])} duplicados, "
+          f"{len(reporte['casi_duplicados'])} casi duplicados) en {reporte['duracion_s']} s")
+    print(f"✓ {reporte['bytes_originales']} → {reporte['bytes_limpios']} bytes: {args.salida}")
+    print(f"✓ Reporte: {args.reporte}")
+
+
+if __name__ == "__main__":
+    main_calidad()
@@ -2,8 +2,6 @@
 import os
 from dotenv import load_dotenv
 from collections import defaultdict
-from openai import OpenAI
-import anthropic
 
 load_dotenv(override=True)
 # EMAIL_ALERTS_ENABLED = os.getenv("EMAIL_ALERTS_ENABLED")
@@ -62,12 +60,63 @@ SALIDA_ENTRADAS_COMPLETO = "entradas_completo.json"
 
 # Archivos del diccionario procesado
 DICCIONARIO_JSON = "diccionario_completo.json"
-ENTRADAS_JSON = "entradas_completo.json"
+
+# Validación y compactación de la extracción (calidad.py)
+ENTRADAS_LIMPIAS_JSON = "entradas_limpias.json"
+REPORTE_CALIDAD_JSON = "reporte_calidad.json"
+UMBRAL_CASI_DUPLICADO = 0.8
+SHINGLE_PALABRAS = 3
+MIN_SHINGLES_COMPARACION = 5
+MINHASH_PERMUTACIONES = 64
+MINHASH_BANDAS = 16
+# Una referencia sin destino casi igual a otra resuelta es una errata de esa
+# ('GLANGLIOS LINFÁTICOS'); por debajo, p. ej. hipo/hipertiroidismo, son distintas
+UMBRAL_ERRATA_REFERENCIA = 0.92
+
+# El chat usa la versión compactada; ENTRADAS_JSON=entradas_completo.json para la original
+ENTRADAS_JSON = os.getenv("ENTRADAS_JSON", ENTRADAS_LIMPIAS_JSON)
+
+# Diccionario exportado a SQLite (python diccionario_sqlite.py). Con
+# ORIGEN_DICCIONARIO=sqlite la búsqueda consulta el fichero en disco en lugar
+# de cargar el JSON en memoria.
+DICCIONARIO_SQLITE = os.getenv("DICCIONARIO_SQLITE", "diccionario.sqlite")
+ORIGEN_DICCIONARIO = os.getenv("ORIGEN_DICCIONARIO", "json")
+# Páginas del fichero mapeadas en memoria: el sistema las comparte entre procesos
+SQLITE_MMAP_BYTES = 256 * 1024 * 1024
+
+# Logging (DEBUG muestra el detalle de cada estrategia de búsqueda)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
 # Configuración del chat
 MAX_ENTRADAS_RELEVANTES = 5
 MAX_TOKENS_RESPUESTA = 5000
 
+# Longitud de la respuesta (num_predict) por petición: base según el tipo de
+# pregunta, más tokens por cada entrada recuperada a partir de la primera, y
+# un factor según el modo elegido por el usuario. MAX_TOKENS_RESPUESTA es el tope.
+MODOS_RESPUESTA = ("breve", "detallada")
+MODO_RESPUESTA = os.getenv("MODO_RESPUESTA", "detallada")
+TOKENS_POR_TIPO = {"definicion": 300, "campo": 350, "general": 500, "comparacion": 700}
+TOKENS_POR_ENTRADA_EXTRA = 100
+FACTOR_MODO = {"breve": 0.4, "detallada": 1.0}
+MIN_TOKENS_RESPUESTA = 80
+# El modelo a veces sigue escribiendo otra PREGUNTA/INFORMACIÓN inventada
+STOP_RESPUESTA = ["\nPREGUNTA:", "\nINFORMACIÓN:", "\nUsuario:"]
+
+# Presupuesto de contexto: se calcula por petición con lo que queda de num_ctx
+# (OLLAMA_OPTIONS) tras la respuesta, las instrucciones y la pregunta
+MAX_TOKENS_CAMPO = 300
+CARACTERES_POR_TOKEN = 3.5
+
+# Entradas de textos normalizados en caché (el diccionario tiene ~2100 entradas)
+TAMANO_CACHE_NORMALIZACION = 8192
+
+# Pasajes: ventanas de frases por campo que se puntúan frente a la pregunta
+PASAJE_FRASES = 2
+MAX_PASAJES_CONTEXTO = 8
+PESO_CAMPO_PEDIDO = 2.0
+PESO_RANGO_ENTRADA = 1.0
+
 # openai_client = OpenAI()
 #
 # gemini = OpenAI(
@@ -87,6 +136,51 @@ MAX_TOKENS_RESPUESTA = 5000
 
 OLLAMA_MODEL = "mistral"
 
+# Tiempo que Ollama mantiene el modelo en memoria tras la última petición
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# Backends de generación, en orden de preferencia inicial
+# (ollama, openai, gemini, perplexity, anthropic, simulado), p. ej. LLM_BACKENDS=ollama,openai
+LLM_BACKENDS = [b.strip() for b in os.getenv("LLM_BACKENDS", "ollama").split(",") if b.strip()]
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+PERPLEXITY_MODEL = os.getenv("PERPLEXITY_MODEL", "sonar")
+ANTHROPIC_MODEL = os.getenv("ANTHROPIC_MODEL", "claude-3-5-haiku-latest")
+
+# Enrutador: ventana de latencias, salud y cobertura (hedging)
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+LLM_VENTANA_LATENCIAS = 50
+LLM_MIN_MUESTRAS = 5
+LLM_MAX_TASA_ERROR = 0.5
+LLM_ENFRIAMIENTO = 60
+LLM_PERCENTIL_COBERTURA = 95
+LLM_MAX_CONCURRENCIA = 16
+
+# Preguntas de seguimiento en el chat: entradas de la sesión que se reutilizan
+MAX_ENTRADAS_SEGUIMIENTO = 3
+
+# Sugerencias de términos mientras se escribe
+MAX_SUGERENCIAS = 8
+MIN_CARACTERES_SUGERENCIA = 2
+
+# Respuestas precalculadas para términos sueltos (--precalcular [N])
+RESPUESTAS_PRECALCULADAS_JSON = "respuestas_precalculadas.json"
+PRECALCULO_TOP_N = int(os.getenv("PRECALCULO_TOP_N", "0"))
+PRECALCULO_PAUSA = float(os.getenv("PRECALCULO_PAUSA", "5"))
+PRECALCULO_EN_SEGUNDO_PLANO = os.getenv("PRECALCULO_EN_SEGUNDO_PLANO", "").lower() in ("1", "true", "si", "sí")
+
+# Servidor: procesos de recuperación que comparten el índice (0 = en el propio proceso)
+SERVIDOR_PROCESOS = int(os.getenv("SERVIDOR_PROCESOS", "0"))
+
+# Modo lote (--batch): procesos de recuperación y peticiones simultáneas al LLM
+BATCH_PROCESOS = int(os.getenv("BATCH_PROCESOS", str(os.cpu_count() or 2)))
+BATCH_CONCURRENCIA_LLM = int(os.getenv("BATCH_CONCURRENCIA_LLM", "2"))
+
+# Backend "simulado" (benchmarks y pruebas de carga): tiempos fijos por token
+SIMULADO_MS_TOKEN_PROMPT = float(os.getenv("SIMULADO_MS_TOKEN_PROMPT", "0.5"))
+SIMULADO_MS_TOKEN = float(os.getenv("SIMULADO_MS_TOKEN", "20"))
+SIMULADO_TOKENS_RESPUESTA = int(os.getenv("SIMULADO_TOKENS_RESPUESTA", "50"))
+
 OLLAMA_OPTIONS = {
     "temperature": 0.3,
     "top_p": 0.9,
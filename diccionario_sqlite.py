@@ -0,0 +1,435 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections.abc import Mapping, Sequence
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Set
+from weakref import WeakValueDictionary
+
+from normalizacion import normalizar, nucleo_de, texto_busqueda, indexar_pasajes, CAMPOS_CONTEXTO
+from config import *
+
+# ============================================================
+# DICCIONARIO EN SQLITE
+# ============================================================
+#
+# Otros servicios necesitan consultar el diccionario sin cargar el JSON ni
+# copiar la lógica de cargar_diccionario. El exportador genera una base SQLite
+# con las entradas, los mismos índices que cargar_diccionario (claves exactas,
+# núcleos, palabras), las referencias cruzadas resueltas y una tabla FTS5.
+#
+# Tablas:
+#   entradas(id, termino, clave, campos..., texto)   id = posición en el JSON
+#       clave = normalizar(termino), texto = texto_busqueda(entrada)
+#   exactos(clave, posicion, entrada_id, nucleo)
+#   palabras(palabra, entrada_id)
+#   referencias(entrada_id, orden, referencia, destino_id)
+#   frecuencia_pasajes(termino, frecuencia)
+#   entradas_fts(termino, definicion, tecnico, sentido_biologico, conflicto)
+#   metadatos(clave, valor)
+#
+# El tokenizador de entradas_fts quita tildes y separa por los mismos
+# caracteres que normalizar, así que sus tokens son las palabras de
+# normalizar(texto): p. ej.
+#   SELECT termino FROM entradas_fts WHERE entradas_fts MATCH 'higado'
+# encuentra 'Hígado'.
+#
+# abrir_diccionario devuelve un diccionario con las mismas claves que
+# cargar_diccionario, respaldado por consultas de solo lectura, para que
+# buscar_entradas y preparar_contexto funcionen sobre el fichero sin cargarlo.
+#
+# Uso: python diccionario_sqlite.py [entradas.json] [--salida diccionario.sqlite]
+
+VERSION_ESQUEMA = "1"
+
+ESQUEMA = """
+CREATE TABLE metadatos (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+CREATE TABLE entradas (
+    id INTEGER PRIMARY KEY,
+    termino TEXT NOT NULL,
+    clave TEXT NOT NULL,
+    definicion TEXT NOT NULL DEFAULT '',
+    tecnico TEXT NOT NULL DEFAULT '',
+    sentido_biologico TEXT NOT NULL DEFAULT '',
+    conflicto TEXT NOT NULL DEFAULT '',
+    pagina_inicio INTEGER,
+    pagina_fin INTEGER,
+    texto TEXT NOT NULL
+);
+CREATE INDEX entradas_clave ON entradas(clave);
+CREATE TABLE exactos (
+    clave TEXT PRIMARY KEY,
+    posicion INTEGER NOT NULL,
+    entrada_id INTEGER NOT NULL REFERENCES entradas(id),
+    nucleo TEXT
+) WITHOUT ROWID;
+CREATE INDEX exactos_nucleo ON exactos(nucleo, posicion);
+CREATE TABLE palabras (
+    palabra TEXT NOT NULL,
+    entrada_id INTEGER NOT NULL REFERENCES entradas(id),
+    PRIMARY KEY (palabra, entrada_id)
+) WITHOUT ROWID;
+CREATE TABLE referencias (
+    entrada_id INTEGER NOT NULL REFERENCES entradas(id),
+    orden INTEGER NOT NULL,
+    referencia TEXT NOT NULL,
+    destino_id INTEGER REFERENCES entradas(id),
+    PRIMARY KEY (entrada_id, orden)
+) WITHOUT ROWID;
+CREATE INDEX referencias_destino ON referencias(destino_id);
+CREATE TABLE frecuencia_pasajes (
+    termino TEXT PRIMARY KEY,
+    frecuencia INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+CAMPOS_TEXTO = [campo for campo, _ in CAMPOS_CONTEXTO]
+
+# Columnas de una entrada, con sus referencias cruzadas en orden
+SELECT_ENTRADA = f"""
+SELECT e.id, e.termino, {", ".join(f"e.{c}" for c in CAMPOS_TEXTO)}, e.pagina_inicio, e.pagina_fin,
+       (SELECT json_group_array(referencia)
+        FROM (SELECT referencia FROM referencias r WHERE r.entrada_id = e.id ORDER BY r.orden))
+FROM entradas e
+"""
+
+# ============================================================
+# EXPORTACIÓN
+# ============================================================
+
+def separadores_normalizacion(entradas: List[Dict]) -> str:
+    """
+    Letras y dígitos del texto que normalizar convierte en espacios (dígitos,
+    'º', letras fuera de a-z...). El tokenizador unicode61 los trataría como
+    parte de la palabra, así que se le pasan como separadores.
+    """
+    caracteres = set("0123456789")
+    for entrada in entradas:
+        for campo in ["termino"] + CAMPOS_TEXTO:
+            caracteres.update(entrada.get(campo) or "")
+    return "".join(sorted(
+        c for c in caracteres
+        if unicodedata.category(c)[0] in "LN" or unicodedata.category(c) == "Co"
+        if not normalizar(c) and c not in "'\""
+    ))
+
+def exportar(entradas: List[Dict], ruta: str = DICCIONARIO_SQLITE, origen: str = "") -> Dict:
+    """
+    Escribe la base de datos completa en un fichero temporal que sustituye
+    al anterior. Devuelve un resumen de lo exportado.
+    """
+    inicio = time.perf_counter()
+    temporal = f"{ruta}.tmp"
+    if os.path.exists(temporal):
+        os.remove(temporal)
+
+    conexion = sqlite3.connect(temporal)
+    try:
+        conexion.executescript(ESQUEMA)
+        conexion.execute(
+            "CREATE VIRTUAL TABLE entradas_fts USING fts5("
+            f"termino, {', '.join(CAMPOS_TEXTO)}, content='entradas', content_rowid='id', "
+            f"tokenize=\"unicode61 remove_diacritics 2 separators '{separadores_normalizacion(entradas)}'\")"
+        )
+
+        claves = [normalizar(e.get("termino", "")) for e in entradas]
+        with conexion:
+            conexion.executemany(
+                f"INSERT INTO entradas (id, termino, clave, {', '.join(CAMPOS_TEXTO)}, pagina_inicio, pagina_fin, texto) "
+                f"VALUES ({', '.join('?' * (len(CAMPOS_TEXTO) + 6))})",
+                (
+                    (i, e.get("termino", ""), clave, *(e.get(c) or "" for c in CAMPOS_TEXTO),
+                     e.get("pagina_inicio"), e.get("pagina_fin"), texto_busqueda(e))
+                    for i, (e, clave) in enumerate(zip(entradas, claves))
+                )
+            )
+
+            # Mismo índice exacto que cargar_diccionario: la posición es la de
+            # la primera aparición de la clave y la entrada la de la última
+            exactos = {}
+            for i, clave in enumerate(claves):
+                exactos[clave] = i
+            filas_exactos = []
+            for posicion, (clave, i) in enumerate(exactos.items()):
+                filas_exactos.append((clave, posicion, i, nucleo_de(clave) or None))
+            conexion.executemany("INSERT INTO exactos VALUES (?, ?, ?, ?)", filas_exactos)
+
+            conexion.executemany(
+                "INSERT OR IGNORE INTO palabras VALUES (?, ?)",
+                ((p, i) for i, clave in enumerate(claves) for p in clave.split() if len(p) > 3)
+            )
+
+            referencias = [
+                (i, orden, referencia, exactos.get(normalizar(referencia)))
+                for i, e in enumerate(entradas)
+                for orden, referencia in enumerate(e.get("referencias_cruzadas") or [])
+            ]
+            conexion.executemany("INSERT INTO referencias VALUES (?, ?, ?, ?)", referencias)
+
+            indice_pasajes, frecuencia = indexar_pasajes(entradas)
+            conexion.executemany("INSERT INTO frecuencia_pasajes VALUES (?, ?)", frecuencia.items())
+
+            conexion.execute("INSERT INTO entradas_fts(entradas_fts) VALUES ('rebuild')")
+
+            resumen = {
+                "version_esquema": VERSION_ESQUEMA,
+                "origen": origen,
+                "fecha": datetime.now().isoformat(timespec="seconds"),
+                "total": len(entradas),
+                "claves": len(exactos),
+                "referencias": len(referencias),
+                "referencias_resueltas": sum(1 for r in referencias if r[3] is not None),
+                "total_pasajes": sum(len(p) for p in indice_pasajes.values()),
+            }
+            conexion.executemany("INSERT INTO metadatos VALUES (?, ?)", ((k, str(v)) for k, v in resumen.items()))
+
+        conexion.execute("INSERT INTO entradas_fts(entradas_fts) VALUES ('optimize')")
+        conexion.execute("ANALYZE")
+        conexion.commit()
+        conexion.execute("VACUUM")
+    finally:
+        conexion.close()
+
+    os.replace(temporal, ruta)
+    resumen["bytes"] = os.path.getsize(ruta)
+    resumen["duracion_s"] = round(time.perf_counter() - inicio, 2)
+    return resumen
+
+# ============================================================
+# CONSULTA (COMPATIBLE CON buscar_entradas)
+# ============================================================
+
+class EntradaSQLite(dict):
+    """Entrada leída de la base de datos (un dict que admite referencias débiles)"""
+
+
+class BaseSQLite:
+    """
+    Conexiones de solo lectura a la base de datos, una por hilo y proceso (un
+    proceso creado con fork abre las suyas). Cada entrada leída es siempre el
+    mismo objeto mientras siga en uso, porque buscar_entradas y los pasajes
+    identifican las entradas por id().
+    """
+
+    def __init__(self, ruta: str = DICCIONARIO_SQLITE):
+        if not os.path.exists(ruta):
+            raise FileNotFoundError(f"No existe {ruta}: ejecuta 'python diccionario_sqlite.py' para generarlo")
+        self.ruta = ruta
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.por_fila: WeakValueDictionary = WeakValueDictionary()
+        self.por_id: WeakValueDictionary = WeakValueDictionary()
+
+    def conexion(self) -> sqlite3.Connection:
+        if getattr(self.local, "pid", None) != os.getpid():
+            conexion = sqlite3.connect(f"file:{self.ruta}?mode=ro", uri=True)
+            conexion.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_BYTES}")
+            self.local.conexion = conexion
+            self.local.pid = os.getpid()
+        return self.local.conexion
+
+    def filas(self, sql: str, parametros=()) -> List[tuple]:
+        return self.conexion().execute(sql, parametros).fetchall()
+
+    def valor(self, sql: str, parametros=()):
+        fila = self.conexion().execute(sql, parametros).fetchone()
+        return fila[0] if fila else None
+
+    def entrada(self, fila: tuple) -> EntradaSQLite:
+        """
+        Entrada a partir de una fila de SELECT_ENTRADA.
+        """
+        id_fila = fila[0]
+        with self.lock:
+            entrada = self.por_fila.get(id_fila)
+            if entrada is not None:
+                return entrada
+
+            campos = dict(zip(CAMPOS_TEXTO, fila[2:2 + len(CAMPOS_TEXTO)]))
+            entrada = EntradaSQLite(termino=fila[1], **campos)
+            entrada["referencias_cruzadas"] = json.loads(fila[-1])
+            for nombre, valor in zip(("pagina_inicio", "pagina_fin"), fila[-3:-1]):
+                if valor is not None:
+                    entrada[nombre] = valor
+
+            self.por_fila[id_fila] = entrada
+            self.por_id[id(entrada)] = entrada
+            return entrada
+
+    def entradas(self, condicion: str, parametros=()) -> List[EntradaSQLite]:
+        return [self.entrada(f) for f in self.filas(f"{SELECT_ENTRADA} {condicion}", parametros)]
+
+    def metadatos(self) -> Dict[str, str]:
+        return dict(self.filas("SELECT clave, valor FROM metadatos"))
+
+
+class VistaSQLite(Mapping):
+    """
+    Índice de solo lectura (clave -> valor) resuelto con una consulta por
+    acceso. buscar devuelve None si la clave no existe.
+    """
+
+    def __init__(self, buscar: Callable, claves: Callable[[], List]):
+        self.buscar = buscar
+        self.claves = claves
+
+    def __getitem__(self, clave):
+        valor = self.buscar(clave)
+        if valor is None:
+            raise KeyError(clave)
+        return valor
+
+    def __contains__(self, clave) -> bool:
+        return self.buscar(clave) is not None
+
+    def __iter__(self) -> Iterator:
+        return iter(self.claves())
+
+    def __len__(self) -> int:
+        return len(self.claves())
+
+
+class EntradasSQLite(Sequence):
+    """Todas las entradas en el orden del JSON, leídas según se recorren"""
+
+    def __init__(self, base: BaseSQLite, total: int):
+        self.base = base
+        self.total = total
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.total))]
+        if i < 0:
+            i += self.total
+        if not 0 <= i < self.total:
+            raise IndexError(i)
+        return self.base.entradas("WHERE e.id = ?", (i,))[0]
+
+    def __iter__(self) -> Iterator[EntradaSQLite]:
+        for fila in self.base.conexion().execute(f"{SELECT_ENTRADA} ORDER BY e.id"):
+            yield self.base.entrada(fila)
+
+    def __len__(self) -> int:
+        return self.total
+
+
+def lista_o_nada(valores: List) -> Optional[List]:
+    return valores or None
+
+def abrir_diccionario(ruta: str = DICCIONARIO_SQLITE) -> Dict:
+    """
+    Diccionario con las claves de cargar_diccionario respaldado por la base
+    de datos. Además incluye "candidatas_keywords", con la que buscar_entradas
+    recorre solo las entradas que pueden pasar los filtros de su estrategia
+    de keywords.
+    """
+    base = BaseSQLite(ruta)
+    metadatos = base.metadatos()
+    if metadatos.get("version_esquema") != VERSION_ESQUEMA:
+        raise ValueError(f"{ruta}: esquema {metadatos.get('version_esquema')}, se esperaba {VERSION_ESQUEMA}")
+
+    def claves_exactas() -> List[str]:
+        return [f[0] for f in base.filas("SELECT clave FROM exactos ORDER BY posicion")]
+
+    def por_nucleo(nucleo: str):
+        filas = base.filas(
+            "SELECT x.posicion, x.entrada_id FROM exactos x WHERE x.nucleo = ? ORDER BY x.posicion", (nucleo,)
+        )
+        if not filas:
+            return None
+        entradas = {e_id: None for _, e_id in filas}
+        for fila in base.filas(
+                f"{SELECT_ENTRADA} WHERE e.id IN ({', '.join('?' * len(entradas))})", tuple(entradas)
+        ):
+            entradas[fila[0]] = base.entrada(fila)
+        return [(posicion, entradas[e_id]) for posicion, e_id in filas]
+
+    def pasajes(id_entrada: int):
+        entrada = base.por_id.get(id_entrada)
+        if entrada is None:
+            return None
+        return indexar_pasajes([entrada])[0][id_entrada]
+
+    def candidatas_keywords(keywords: List[str], nucleos: Set[str], referencias: Set[str]) -> Iterator[EntradaSQLite]:
+        """
+        Entradas, en orden, que contienen alguna keyword como palabra completa
+        (FTS5) y algún núcleo dentro de su texto, con texto de menos de 3000
+        caracteres y, si hay referencias, que sean una de ellas. Las keywords
+        con dígitos no pueden aparecer en un texto normalizado y se descartan.
+        Se leen según se recorren: buscar_entradas para al llegar a su límite.
+        """
+        keywords = [k for k in keywords if k.isascii() and k.isalpha()]
+        if not keywords or not nucleos:
+            return
+        condiciones = [
+            "e.id IN (SELECT rowid FROM entradas_fts WHERE entradas_fts MATCH ?)",
+            "length(e.texto) < 3000",
+            f"({' OR '.join('instr(e.texto, ?) > 0' for _ in nucleos)})",
+        ]
+        parametros = [" OR ".join(f'"{k}"' for k in keywords), *nucleos]
+        if referencias:
+            condiciones.append(f"e.termino IN ({', '.join('?' * len(referencias))})")
+            parametros.extend(referencias)
+        for fila in base.conexion().execute(
+                f"{SELECT_ENTRADA} WHERE {' AND '.join(condiciones)} ORDER BY e.id", parametros
+        ):
+            yield base.entrada(fila)
+
+    total = int(metadatos["total"])
+    return {
+        "entradas": EntradasSQLite(base, total),
+        "indice_exacto": VistaSQLite(
+            lambda clave: (base.entradas(
+                "JOIN exactos x ON x.entrada_id = e.id WHERE x.clave = ?", (clave,)
+            ) or [None])[0],
+            claves_exactas
+        ),
+        "indice_palabras": VistaSQLite(
+            lambda palabra: lista_o_nada(base.entradas(
+                "JOIN palabras p ON p.entrada_id = e.id WHERE p.palabra = ? ORDER BY e.id", (palabra,)
+            )),
+            lambda: [f[0] for f in base.filas("SELECT DISTINCT palabra FROM palabras")]
+        ),
+        "orden_exacto": VistaSQLite(
+            lambda clave: base.valor("SELECT posicion FROM exactos WHERE clave = ?", (clave,)),
+            claves_exactas
+        ),
+        "indice_nucleos": VistaSQLite(
+            por_nucleo,
+            lambda: [f[0] for f in base.filas("SELECT DISTINCT nucleo FROM exactos WHERE nucleo IS NOT NULL")]
+        ),
+        "indice_pasajes": VistaSQLite(pasajes, lambda: list(base.por_id.keys())),
+        "frecuencia_pasajes": VistaSQLite(
+            lambda termino: base.valor("SELECT frecuencia FROM frecuencia_pasajes WHERE termino = ?", (termino,)),
+            lambda: [f[0] for f in base.filas("SELECT termino FROM frecuencia_pasajes")]
+        ),
+        "total_pasajes": int(metadatos["total_pasajes"]),
+        "total": total,
+        "candidatas_keywords": candidatas_keywords,
+        "sqlite": ruta,
+    }
+
+def main_diccionario_sqlite():
+    parser = argparse.ArgumentParser(description="Exporta el diccionario a SQLite (FTS5)")
+    parser.add_argument("entrada", nargs="?", default=ENTRADAS_JSON)
+    parser.add_argument("--salida", default=DICCIONARIO_SQLITE)
+    args = parser.parse_args()
+
+    with open(args.entrada, 'r', encoding='utf-8') as f:
+        entradas = json.load(f)
+
+    resumen = exportar(entradas, args.salida, origen=args.entrada)
+    print(f"✓ {resumen['total']} entradas ({resumen['claves']} claves, {resumen['referencias_resueltas']}/"
+          f"{resumen['referencias']} referencias resueltas) en {resumen['duracion_s']} s")
+    print(f"✓ {resumen['bytes']} bytes: {args.salida}")
+
+
+if __name__ == "__main__":
+    main_diccionario_sqlite()
@@ -0,0 +1,174 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Set
+from metricas import logger
+from recuperacion import PoolRecuperacion
+from config import *
+
+# ============================================================
+# MODO LOTE: PREGUNTAS DESDE JSONL
+# ============================================================
+#
+# La recuperación (CPU, Python puro) se reparte en un pool de procesos y la
+# generación va al LLM con concurrencia acotada desde hilos. Cada respuesta
+# se escribe en cuanto está lista, así que si el proceso se interrumpe basta
+# con relanzarlo con la misma salida: las preguntas ya respondidas se saltan.
+
+def leer_preguntas(ruta: str) -> Iterator[Dict]:
+    """
+    Lee el JSONL de entrada línea a línea. Cada línea es {"pregunta": ...}
+    con un "id" opcional; si falta, se usa el número de línea.
+    """
+    with open(ruta, 'r', encoding='utf-8') as f:
+        for numero, linea in enumerate(f, 1):
+            if not linea.strip():
+                continue
+            try:
+                datos = json.loads(linea)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Línea {numero} ignorada (JSON no válido): {e}")
+                continue
+            if not isinstance(datos, dict):
+                logger.warning(f"Línea {numero} ignorada: se esperaba un objeto JSON")
+                continue
+            pregunta = datos.get("pregunta")
+            if not isinstance(pregunta, str) or not pregunta.strip():
+                logger.warning(f"Línea {numero} ignorada: sin pregunta")
+                continue
+            pregunta = pregunta.strip()
+            yield {"id": str(datos.get("id", numero)), "pregunta": pregunta}
+
+def ids_completados(ruta: str) -> Set[str]:
+    """
+    Ids ya respondidos en una salida anterior. Una última línea cortada por
+    una interrupción se ignora (esa pregunta se repetirá).
+    """
+    completados = set()
+    if not os.path.exists(ruta):
+        return completados
+    with open(ruta, 'r', encoding='utf-8') as f:
+        for linea in f:
+            try:
+                completados.add(str(json.loads(linea)["id"]))
+            except (json.JSONDecodeError, KeyError):
+                continue
+    return completados
+
+def procesar_lote(
+        entrada: str,
+        salida: str,
+        datos_diccionario: Dict,
+        cargar: Callable,
+        preparar: Callable,
+        generar: Callable,
+        procesos: int = BATCH_PROCESOS,
+        concurrencia_llm: int = BATCH_CONCURRENCIA_LLM,
+        modo: str = MODO_RESPUESTA
+) -> Dict:
+    """
+    Responde todas las preguntas de entrada y las añade a salida (JSONL) con
+    fuentes y tiempos. Devuelve un resumen del lote.
+    """
+    completados = ids_completados(salida)
+    if completados:
+        logger.info(f"Reanudando: {len(completados)} preguntas ya respondidas en {salida}")
+
+    # Los procesos se crean ya, con fork, antes de abrir los hilos del lote
+    pool = PoolRecuperacion(datos_diccionario, cargar, preparar, procesos).arrancar()
+    limite_llm = threading.Semaphore(concurrencia_llm)
+    # Preguntas en vuelo: acota la memoria aunque la entrada sea enorme
+    en_vuelo = threading.Semaphore((procesos + concurrencia_llm) * 2)
+    lock_salida = threading.Lock()
+    resumen = {"respondidas": 0, "saltadas": 0, "errores": 0}
+    inicio_lote = time.perf_counter()
+
+    try:
+        with open(salida, 'a', encoding='utf-8') as f_salida, \
+                ThreadPoolExecutor(max_workers=procesos + concurrencia_llm) as hilos:
+
+            def responder(item: Dict):
+                try:
+                    inicio = time.perf_counter()
+                    preparado = pool.preparar(item["pregunta"], modo)
+
+                    if preparado["fuentes"]:
+                        with limite_llm:
+                            inicio_llm = time.perf_counter()
+                            respuesta, metricas = generar(
+                                item["pregunta"], preparado["contexto"], len(preparado["fuentes"]), modo,
+                                preparado["opciones"]
+                            )
+                            generacion_ms = round((time.perf_counter() - inicio_llm) * 1000, 1)
+                        if not metricas:
+                            raise RuntimeError(respuesta)
+                    else:
+                        respuesta, metricas, generacion_ms = None, {}, 0.0
+
+                    registro = {
+                        "id": item["id"],
+                        "pregunta": item["pregunta"],
+                        "respuesta": respuesta,
+                        "fuentes": preparado["fuentes"],
+                        "es_relevante": bool(preparado["fuentes"]),
+                        "tokens_contexto": preparado["tokens_contexto"],
+                        "tiempos": {
+                            "recuperacion_ms": preparado["recuperacion_ms"],
+                            "generacion_ms": generacion_ms,
+                            "total_ms": round((time.perf_counter() - inicio) * 1000, 1)
+                        },
+                        "metricas": metricas
+                    }
+                    with lock_salida:
+                        f_salida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                        f_salida.flush()
+                        resumen["respondidas"] += 1
+                except Exception as e:
+                    logger.warning(f"Pregunta {item['id']} no respondida: {e}")
+                    with lock_salida:
+                        resumen["errores"] += 1
+                finally:
+                    en_vuelo.release()
+
+            for item in leer_preguntas(entrada):
+                if item["id"] in completados:
+                    resumen["saltadas"] += 1
+                    continue
+                en_vuelo.acquire()
+                hilos.submit(responder, item)
+
+    finally:
+        # También si se interrumpe: el lote se reanuda y no deben quedar procesos
+        pool.cerrar()
+    resumen["duracion_s"] = round(time.perf_counter() - inicio_lote, 2)
+    return resumen
+
+def main_lote(
+        argumentos: List[str],
+        datos_diccionario: Dict,
+        cargar: Callable,
+        preparar: Callable,
+        generar: Callable
+):
+    parser = argparse.ArgumentParser(prog="main.py --batch", description="Responde preguntas desde un JSONL")
+    parser.add_argument("entrada", help="JSONL con {\"id\": ..., \"pregunta\": ...} por línea")
+    parser.add_argument("--salida", help="JSONL de respuestas (por defecto <entrada>.respuestas.jsonl)")
+    parser.add_argument("--procesos", type=int, default=BATCH_PROCESOS, help="procesos de recuperación")
+    parser.add_argument("--concurrencia", type=int, default=BATCH_CONCURRENCIA_LLM,
+                        help="peticiones simultáneas al LLM")
+    parser.add_argument("--modo", choices=MODOS_RESPUESTA, default=MODO_RESPUESTA, help="longitud de las respuestas")
+    args = parser.parse_args(argumentos)
+
+    salida = args.salida or os.path.splitext(args.entrada)[0] + ".respuestas.jsonl"
+    resumen = procesar_lote(
+        args.entrada, salida, datos_diccionario, cargar, preparar, generar,
+        args.procesos, args.concurrencia, args.modo
+    )
+    print(
+        f"✓ Lote terminado en {resumen['duracion_s']} s: {resumen['respondidas']} respondidas, "
+        f"{resumen['saltadas']} ya hechas, {resumen['errores']} con error → {salida}"
+    )
+    return resumen
@@ -1,47 +1,33 @@
 import json
-from typing import List, Dict, Tuple
-import unicodedata
-import re
-import gradio as gr
+import math
 import os
-os.environ["OLLAMA_HOST"] = os.getenv("OLLAMA_HOST", "http://host.docker.internal:11434")
-import ollama
+import threading
+import time
+from typing import Iterator, List, Literal, Dict, Optional, Set, Tuple
+import re
+from backends import obtener_enrutador
+from precalculo import AlmacenPrecalculado, TrabajadorPrecalculo
+from sugerencias import IndicePrefijos
+from normalizacion import (
+    normalizar, limpiar_texto, singularizar, nucleo_de, texto_busqueda, indexar_pasajes,
+    terminos_pasaje, PALABRAS_GENERICAS, STOPWORDS, CAMPOS_CONTEXTO
+)
+from metricas import (
+    logger, configurar_logging, medir, traza, nueva_traza, en_traza, emitir_traza,
+    anotar_span, incrementar, registrar_medidor, registrar_cache, exportar_prometheus
+)
 from config import *
 
 # ============================================================
 # SISTEMA DE BÚSQUEDA
 # ============================================================
 
-def normalizar(texto: str) -> str:
-    texto = texto.lower()
-    texto = unicodedata.normalize("NFD", texto)
-    texto = "".join(c for c in texto if unicodedata.category(c) != "Mn")
-    texto = re.sub(r"[\d\-_/]", " ", texto)
-    texto = re.sub(r"[^a-z\s]", " ", texto)
-    texto = re.sub(r"\s+", " ", texto)
-    return texto.strip()
-
-def singularizar(palabra: str) -> str:
-    if palabra.endswith("es"):
-        return palabra[:-2]
-    if palabra.endswith("s"):
-        return palabra[:-1]
-    return palabra
-
-PALABRAS_GENERICAS = {
-    "problema", "problemas",
-    "emocion", "emociones",
-    "conflicto", "conflictos",
-    "trastorno", "trastornos",
-    "alteracion", "alteraciones",
-    "sintoma", "sintomas"
-}
-
 def buscar_entradas(termino: str, datos_diccionario: Dict, limite: int = 10) -> List[Dict]:
     """
     Búsqueda con múltiples estrategias.
     """
-    termino_norm = normalizar(termino)
+    with medir("normalizacion"):
+        termino_norm = normalizar(termino)
     resultados = []
     resultados_ids = set()
 
@@ -57,39 +43,40 @@ def buscar_entradas(termino: str, datos_diccionario: Dict, limite: int = 10) ->
             len(palabras_consulta) <= 2
     )
 
-    print(f"  Buscando: '{termino_norm}'")
+    logger.debug(f"Buscando: '{termino_norm}'")
 
     # =====================================================
     # Estrategia 1: Coincidencia exacta y núcleo semántico
     # =====================================================
 
-    for clave, entrada in datos_diccionario["indice_exacto"].items():
-        if id(entrada) in resultados_ids:
-            continue
-
-        # clave normalizada completa
-        if termino_norm == clave:
+    with medir("estrategia_exacta"):
+        # Búsquedas en diccionario en lugar de recorrer todo el índice exacto.
+        # Se conserva el orden del recorrido original: núcleos por orden del
+        # índice y, si hay coincidencia exacta, solo los núcleos anteriores a ella
+        exacta = datos_diccionario["indice_exacto"].get(termino_norm)
+        fin = datos_diccionario["orden_exacto"][termino_norm] if exacta is not None else math.inf
+
+        por_nucleo = sorted(
+            (
+                (posicion, entrada)
+                for palabra in set(palabras_consulta)
+                for posicion, entrada in datos_diccionario["indice_nucleos"].get(palabra, [])
+                if posicion < fin
+            ),
+            key=lambda par: par[0]
+        )
+        for _, entrada in por_nucleo:
             resultados.insert(0, entrada)
             resultados_ids.add(id(entrada))
-            print(f"    ★ Encontrado por coincidencia exacta: {entrada.get('termino')}")
+            logger.debug(f"★ Encontrado por núcleo semántico: {entrada.get('termino')}")
+
+        if exacta is not None:
+            resultados.insert(0, exacta)
+            logger.debug(f"★ Encontrado por coincidencia exacta: {exacta.get('termino')}")
             # Si se encuentra una coincidencia exacta, eliminar todas las demás
-            print(f"  Total encontrados: {len(resultados)}")
+            logger.debug(f"Total encontrados: {len(resultados)}")
             return resultados[:limite]
 
-        palabras_consulta = set(termino_norm.split())
-        # núcleo semántico (primera palabra del término)
-        # núcleo semántico (palabra completa)
-        nucleo = clave.split()[0]
-
-        if (len(nucleo) < 5 or
-                nucleo in PALABRAS_GENERICAS):
-            continue
-
-        if nucleo in palabras_consulta:
-            resultados.insert(0, entrada)
-            resultados_ids.add(id(entrada))
-            print(f"    ★ Encontrado por núcleo semántico: {entrada.get('termino')}")
-
     # =====================================================
     # Preparar referencias cruzadas desde términos nucleares
     # =====================================================
@@ -99,28 +86,29 @@ def buscar_entradas(termino: str, datos_diccionario: Dict, limite: int = 10) ->
 
     # Estrategia 2: Búsqueda por palabras individuales
     # palabras = termino_norm.split()
-    palabras = []
-    for p in termino_norm.split():
-        if len(p) <= 3:
-            continue
-
-        if (p in PALABRAS_GENERICAS
-                and not BUSQUEDA_GENERICA_INTENCIONAL):
-            continue
-
-        palabras.append(singularizar(p))
-
-    for palabra in palabras:
-        if len(palabra) > 2 and palabra in datos_diccionario["indice_palabras"]:
-            for entrada in datos_diccionario["indice_palabras"][palabra]:
-                if id(entrada) in resultados_ids:
-                    continue
-                if referencias and entrada.get("termino") not in referencias:
-                    continue
-                if len(resultados) < limite * 3:
-                    resultados.append(entrada)
-                    resultados_ids.add(id(entrada))
-                    print(f"    ✓ Encontrado por palabra '{palabra}': {entrada.get('termino')}")
+    with medir("estrategia_palabras"):
+        palabras = []
+        for p in termino_norm.split():
+            if len(p) <= 3:
+                continue
+
+            if (p in PALABRAS_GENERICAS
+                    and not BUSQUEDA_GENERICA_INTENCIONAL):
+                continue
+
+            palabras.append(singularizar(p))
+
+        for palabra in palabras:
+            if len(palabra) > 2 and palabra in datos_diccionario["indice_palabras"]:
+                for entrada in datos_diccionario["indice_palabras"][palabra]:
+                    if id(entrada) in resultados_ids:
+                        continue
+                    if referencias and entrada.get("termino") not in referencias:
+                        continue
+                    if len(resultados) < limite * 3:
+                        resultados.append(entrada)
+                        resultados_ids.add(id(entrada))
+                        logger.debug(f"✓ Encontrado por palabra '{palabra}': {entrada.get('termino')}")
 
     # Detectar núcleo semántico principal (singularizado)
     nucleos = set()
@@ -141,42 +129,43 @@ def buscar_entradas(termino: str, datos_diccionario: Dict, limite: int = 10) ->
                 NUCLEOS_REALES.add(palabra)
 
     # Estrategia 3: Búsqueda por keywords normalizadas (semántica ligera)
-    keywords = extraer_keywords(termino)
-
-    for entrada in datos_diccionario["entradas"]:
-        if id(entrada) in resultados_ids:
-            continue
-
-        # 🔒 Filtro semántico guiado por referencias cruzadas
-        if referencias and entrada.get("termino") not in referencias:
-            continue
-
-        texto_entrada = normalizar(" ".join([
-            entrada.get("termino", ""),
-            entrada.get("definicion", ""),
-            entrada.get("conflicto", ""),
-            entrada.get("sentido_biologico", ""),
-            entrada.get("tecnico", "")
-        ]))
-
-        texto_entrada = limpiar_texto(texto_entrada)
-
-        coincidencias = sum(1 for k in keywords if f" {k} " in f" {texto_entrada} ")
-
-        if (coincidencias >= 1 and
-                any(n in texto_entrada for n in NUCLEOS_REALES) and
-                len(texto_entrada) < 3000):
-            resultados.append(entrada)
-            resultados_ids.add(id(entrada))
-            print(
-                f"    ✓ Encontrado por keywords ({coincidencias}): "
-                f"{entrada.get('termino')}"
-            )
-
-        if len(resultados) >= limite * 3:
-            break
-
-    print(f"  Total encontrados: {len(resultados)}")
+    with medir("estrategia_keywords"):
+        keywords = extraer_keywords(termino)
+
+        # En SQLite (diccionario_sqlite) la base de datos descarta las entradas
+        # que no pasarían los filtros de abajo, que se aplican igualmente
+        candidatas_keywords = datos_diccionario.get("candidatas_keywords")
+        if candidatas_keywords:
+            candidatas = candidatas_keywords(keywords, NUCLEOS_REALES, referencias)
+        else:
+            candidatas = datos_diccionario["entradas"]
+
+        for entrada in candidatas:
+            if id(entrada) in resultados_ids:
+                continue
+
+            # 🔒 Filtro semántico guiado por referencias cruzadas
+            if referencias and entrada.get("termino") not in referencias:
+                continue
+
+            texto_entrada = texto_busqueda(entrada)
+
+            coincidencias = sum(1 for k in keywords if f" {k} " in f" {texto_entrada} ")
+
+            if (coincidencias >= 1 and
+                    any(n in texto_entrada for n in NUCLEOS_REALES) and
+                    len(texto_entrada) < 3000):
+                resultados.append(entrada)
+                resultados_ids.add(id(entrada))
+                logger.debug(
+                    f"✓ Encontrado por keywords ({coincidencias}): "
+                    f"{entrada.get('termino')}"
+                )
+
+            if len(resultados) >= limite * 3:
+                break
+
+    logger.debug(f"Total encontrados: {len(resultados)}")
     return resultados[:limite]
 
 # ============================================================
@@ -200,121 +189,884 @@ def cargar_diccionario() -> Dict:
                 if len(palabra) > 3:
                     indice_palabras.setdefault(palabra, []).append(entrada)
 
+        # Posición de cada clave en el índice exacto y entradas por núcleo
+        # semántico (primera palabra de la clave) para la estrategia 1
+        orden_exacto = {}
+        indice_nucleos = {}
+        for posicion, (clave, entrada) in enumerate(indice_exacto.items()):
+            orden_exacto[clave] = posicion
+            nucleo = nucleo_de(clave)
+            if nucleo:
+                indice_nucleos.setdefault(nucleo, []).append((posicion, entrada))
+
+        indice_pasajes, frecuencia_pasajes = indexar_pasajes(entradas)
+
         return {
             "entradas": entradas,
             "indice_exacto": indice_exacto,
             "indice_palabras": indice_palabras,
+            "orden_exacto": orden_exacto,
+            "indice_nucleos": indice_nucleos,
+            "indice_pasajes": indice_pasajes,
+            "frecuencia_pasajes": frecuencia_pasajes,
+            "total_pasajes": sum(len(p) for p in indice_pasajes.values()),
             "total": len(entradas)
         }
     except FileNotFoundError:
-        return {"entradas": [], "indice_exacto": {}, "indice_palabras": {}, "total": 0}
+        return {"entradas": [], "indice_exacto": {}, "indice_palabras": {},
+                "orden_exacto": {}, "indice_nucleos": {}, "indice_pasajes": {}, "frecuencia_pasajes": {}, "total_pasajes": 0, "total": 0}
+
 
+# Orden en el que se muestran los campos dentro de cada entrada
+ORDEN_CAMPOS = ["definicion", "tecnico", "sentido_biologico", "conflicto"]
 
-# Cargar diccionario al iniciar
-print(f"Cargando diccionario...")
-diccionario_data = cargar_diccionario()
-print(f"✓ Diccionario cargado: {diccionario_data['total']} entradas")
+ETIQUETAS_CAMPOS = dict(CAMPOS_CONTEXTO)
+CAMPOS_PRIORIDAD = {campo: i for i, (campo, _) in enumerate(CAMPOS_CONTEXTO)}
 
-def construir_contexto(entradas: List[Dict]) -> str:
+FIN_DE_FRASE = re.compile(r"[.!?…](?=\s|$)")
+
+def contar_tokens(texto: str) -> int:
+    """
+    Estimación rápida del número de tokens de un texto.
+    """
+    if not texto:
+        return 0
+    return math.ceil(len(texto) / CARACTERES_POR_TOKEN)
+
+def recortar_en_frase(texto: str, max_tokens: int) -> str:
+    """
+    Recorta el texto para que quepa en max_tokens, cortando en fin de frase
+    si es posible y si no en el último espacio.
     """
-    Construye el contexto para el modelo a partir de las entradas encontradas.
+    texto = texto.strip()
+    if contar_tokens(texto) <= max_tokens:
+        return texto
+
+    limite = int(max_tokens * CARACTERES_POR_TOKEN) - 1
+    if limite <= 0:
+        return ""
+    corte = texto[:limite]
+
+    finales = list(FIN_DE_FRASE.finditer(corte))
+    if finales:
+        return corte[:finales[-1].end()]
+
+    espacio = corte.rfind(" ")
+    if espacio <= 0:
+        return ""
+    return corte[:espacio].rstrip(",;:") + "…"
+
+def construir_contexto(
+        entradas: List[Dict],
+        max_tokens: int,
+        pasajes: List[Dict] = None
+) -> Tuple[str, int]:
+    """
+    Construye el contexto para el modelo a partir de las entradas encontradas,
+    sin superar max_tokens (ver presupuesto_contexto). Devuelve el contexto y
+    los tokens estimados.
+
+    Las entradas llegan ordenadas por relevancia: primero se reservan las
+    cabeceras y después se rellenan los fragmentos por prioridad. Si se
+    pasan pasajes (ver seleccionar_pasajes) solo se incluyen esos; si no,
+    los campos completos (todas las definiciones, luego los conflictos...).
     """
     if not entradas:
-        return "No se encontró información relevante en el diccionario."
+        contexto = "No se encontró información relevante en el diccionario."
+        return contexto, contar_tokens(contexto)
 
-    contexto = "INFORMACIÓN DEL DICCIONARIO DE BIODESCODIFICACIÓN:\n\n"
+    cabecera = "INFORMACIÓN DEL DICCIONARIO DE BIODESCODIFICACIÓN:\n\n"
+    usados = contar_tokens(cabecera)
 
+    bloques = []
     for i, entrada in enumerate(entradas, 1):
-        contexto += f"--- Entrada {i}: {entrada.get('termino', 'N/A')} ---\n"
-        contexto += f"Definición: {entrada.get('definicion', 'N/A')}\n"
-        contexto += f"Técnico: {entrada.get('tecnico', 'N/A')}\n"
-        contexto += f"Sentido Biológico: {entrada.get('sentido_biologico', 'N/A')}\n"
-        contexto += f"Conflicto: {entrada.get('conflicto', 'N/A')}\n"
+        titulo = f"--- Entrada {i}: {entrada.get('termino', 'N/A')} ---\n"
+        coste = contar_tokens(titulo) + 1
+        if usados + coste > max_tokens:
+            break
+        bloques.append({"titulo": titulo, "campos": {}, "referencias": ""})
+        usados += coste
+
+    # Fragmentos (posición de la entrada, campo, orden, texto) por prioridad
+    if pasajes:
+        fragmentos = [
+            (p["posicion"], p["campo"], p["orden"], p["texto"])
+            for p in pasajes
+        ]
+    else:
+        fragmentos = [
+            (i, campo, 0, entrada.get(campo))
+            for campo, _ in CAMPOS_CONTEXTO
+            for i, entrada in enumerate(entradas)
+            if entrada.get(campo)
+        ]
+
+    for posicion, campo, orden, valor in fragmentos:
+        if posicion >= len(bloques):
+            continue
+        prefijo = f"{ETIQUETAS_CAMPOS[campo]}: "
+        disponible = min(MAX_TOKENS_CAMPO, max_tokens - usados) - contar_tokens(prefijo) - 1
+        if disponible <= 0:
+            continue
+        texto = recortar_en_frase(valor, disponible)
+        if not texto:
+            continue
+        bloques[posicion]["campos"].setdefault(campo, []).append((orden, texto))
+        usados += contar_tokens(f"{prefijo}{texto}\n")
+
+    for entrada, bloque in zip(entradas, bloques):
         if entrada.get("referencias_cruzadas"):
-            contexto += f"Referencias: {', '.join(entrada['referencias_cruzadas'])}\n"
+            linea = f"Referencias: {', '.join(entrada['referencias_cruzadas'])}\n"
+            coste = contar_tokens(linea)
+            if usados + coste <= max_tokens:
+                bloque["referencias"] = linea
+                usados += coste
+
+    contexto = cabecera
+    for bloque in bloques:
+        contexto += bloque["titulo"]
+        for campo in ORDEN_CAMPOS:
+            if campo in bloque["campos"]:
+                textos = [t for _, t in sorted(bloque["campos"][campo])]
+                contexto += f"{ETIQUETAS_CAMPOS[campo]}: {' … '.join(textos)}\n"
+        contexto += bloque["referencias"]
         contexto += "\n"
 
-    return contexto
+    return contexto, contar_tokens(contexto)
 
-STOPWORDS = {
-    "se", "puede", "ser", "a", "la", "el", "los", "las",
-    "un", "una", "de", "que", "y", "o", "es"
+# ============================================================
+# PASAJES RELEVANTES
+# ============================================================
+
+# Palabras de la pregunta que indican qué campo interesa
+PALABRAS_CAMPO = {
+    "definicion": "definicion",
+    "significa": "definicion",
+    "tecnico": "tecnico",
+    "embrionaria": "tecnico",
+    "etapa": "tecnico",
+    "sentido": "sentido_biologico",
+    "biologico": "sentido_biologico",
+    "conflicto": "conflicto",
+    "emocion": "conflicto",
+    "emocional": "conflicto",
 }
 
+def campos_pedidos(pregunta: str) -> Set[str]:
+    """
+    Campos que pide la pregunta, también en plural ('conflictos emocionales').
+    """
+    palabras = (singularizar(p) for p in limpiar_texto(pregunta).split())
+    return {PALABRAS_CAMPO[p] for p in palabras if p in PALABRAS_CAMPO}
+
+def seleccionar_pasajes(
+        pregunta: str,
+        entradas: List[Dict],
+        datos_diccionario: Dict,
+        limite: int = MAX_PASAJES_CONTEXTO
+) -> List[Dict]:
+    """
+    Puntúa los pasajes de las entradas encontradas frente a la pregunta y
+    devuelve los mejores, de más a menos relevante. Cada entrada conserva
+    al menos su mejor pasaje para que ninguna cabecera quede vacía.
+    """
+    indice = datos_diccionario.get("indice_pasajes", {})
+    frecuencia = datos_diccionario.get("frecuencia_pasajes", {})
+    total = datos_diccionario.get("total_pasajes", 0) or 1
+
+    terminos = terminos_pasaje(pregunta)
+    campos = campos_pedidos(pregunta)
+
+    candidatos = []
+    for posicion, entrada in enumerate(entradas):
+        for pasaje in indice.get(id(entrada), []):
+            puntuacion = sum(
+                math.log(1 + total / frecuencia.get(t, 1))
+                for t in terminos & pasaje["terminos"]
+            )
+            if pasaje["campo"] in campos:
+                puntuacion += PESO_CAMPO_PEDIDO
+            puntuacion += PESO_RANGO_ENTRADA / (posicion + 1)
+            candidatos.append((
+                -puntuacion, posicion, CAMPOS_PRIORIDAD[pasaje["campo"]], pasaje["orden"],
+                {**pasaje, "posicion": posicion, "puntuacion": puntuacion}
+            ))
+
+    candidatos.sort(key=lambda c: c[:4])
+
+    seleccionados = []
+    elegidos = set()
+    cubiertas = set()
+    for c in candidatos:
+        if c[1] not in cubiertas:
+            cubiertas.add(c[1])
+            elegidos.add(c[1:4])
+            seleccionados.append(c)
+    for c in candidatos:
+        if len(seleccionados) >= max(limite, len(cubiertas)):
+            break
+        if c[1:4] not in elegidos:
+            elegidos.add(c[1:4])
+            seleccionados.append(c)
+
+    seleccionados.sort(key=lambda c: c[:4])
+    return [c[4] for c in seleccionados]
+
 def extraer_keywords(pregunta: str) -> list[str]:
     texto = limpiar_texto(pregunta)
     palabras = texto.split()
     return [p for p in palabras if p not in STOPWORDS and len(p) > 3]
 
-def limpiar_texto(texto: str) -> str:
-    texto = texto.lower()
-    texto = unicodedata.normalize("NFD", texto)
-    texto = "".join(c for c in texto if unicodedata.category(c) != "Mn")
-    texto = re.sub(r"[^a-z0-9\s]", " ", texto)
-    texto = re.sub(r"\s+", " ", texto).strip()
-    return texto
+# Diccionario y respuestas precalculadas: se cargan al primer uso, así que
+# importar main (herramientas, benchmarks) no paga la construcción del índice
+diccionario_data = None
+almacen_precalculado = None
+indice_sugerencias = None
+lock_carga = threading.Lock()
+
+def cargar_segun_origen() -> Dict:
+    """
+    El diccionario en memoria (JSON) o consultado en disco (SQLite) según
+    ORIGEN_DICCIONARIO.
+    """
+    if ORIGEN_DICCIONARIO == "sqlite":
+        from diccionario_sqlite import abrir_diccionario
+        return abrir_diccionario(DICCIONARIO_SQLITE)
+    return cargar_diccionario()
+
+def obtener_diccionario() -> Dict:
+    """
+    Diccionario compartido, cargado la primera vez que se necesita.
+    """
+    global diccionario_data
+    with lock_carga:
+        if diccionario_data is None:
+            logger.info(f"Cargando diccionario ({ORIGEN_DICCIONARIO})...")
+            diccionario_data = cargar_segun_origen()
+            logger.info(f"✓ Diccionario cargado: {diccionario_data['total']} entradas")
+        return diccionario_data
+
+def obtener_almacen_precalculado() -> AlmacenPrecalculado:
+    global almacen_precalculado
+    with lock_carga:
+        if almacen_precalculado is None:
+            almacen_precalculado = AlmacenPrecalculado()
+        return almacen_precalculado
+
+# ============================================================
+# RESPUESTAS PRECALCULADAS
+# ============================================================
+
+# Palabras de pregunta que no cuentan para reconocer un término suelto
+PALABRAS_PREGUNTA = {"que", "cual", "cuales", "como", "del", "al", "sobre", "significa"}
+
+def calcular_popularidad(datos_diccionario: Dict) -> Dict[str, int]:
+    """
+    Popularidad de cada término (normalizado): cuántas entradas lo citan en
+    sus referencias cruzadas.
+    """
+    popularidad = {clave: 0 for clave in datos_diccionario["indice_exacto"]}
+    for entrada in datos_diccionario["entradas"]:
+        for referencia in entrada.get("referencias_cruzadas", []):
+            clave = normalizar(referencia)
+            if clave in popularidad:
+                popularidad[clave] += 1
+    return popularidad
+
+def terminos_para_precalcular(datos_diccionario: Dict, top_n: int = PRECALCULO_TOP_N) -> List[Tuple[str, str]]:
+    """
+    (clave, término) ordenados por popularidad; top_n = 0 para todos.
+    """
+    popularidad = calcular_popularidad(datos_diccionario)
+    claves = sorted(popularidad, key=lambda c: (-popularidad[c], c))
+    if top_n:
+        claves = claves[:top_n]
+    return [(c, datos_diccionario["indice_exacto"][c]["termino"]) for c in claves if c]
+
+def clave_por_nucleo(palabra: str, datos_diccionario: Dict) -> Optional[str]:
+    """
+    Clave del término del diccionario con ese núcleo (o su singular), solo si
+    es el único: con varios ('alergia al sol', 'alergia al polen'...) no se
+    sabe cuál se pregunta.
+    """
+    for forma in (palabra, singularizar(palabra)):
+        entradas = datos_diccionario["indice_nucleos"].get(forma)
+        if entradas:
+            return normalizar(entradas[0][1]["termino"]) if len(entradas) == 1 else None
+    return None
+
+def buscar_precalculada(pregunta: str, datos_diccionario: Dict) -> Dict:
+    """
+    Respuesta precalculada si la pregunta es exactamente un término o se
+    reduce al núcleo de un único término ('¿Qué es la rosácea?' -> 'rosacea').
+    La unicidad se decide en el diccionario, no en lo ya precalculado.
+    """
+    almacen = obtener_almacen_precalculado()
+    if not len(almacen):
+        return None
+    pregunta_norm = normalizar(pregunta)
+    resultado = almacen.obtener(pregunta_norm)
+    if resultado is None:
+        palabras = [
+            p for p in pregunta_norm.split()
+            if p not in STOPWORDS and p not in PALABRAS_PREGUNTA
+        ]
+        if len(palabras) == 1:
+            clave = palabras[0]
+            if clave not in datos_diccionario["indice_exacto"]:
+                clave = clave_por_nucleo(clave, datos_diccionario)
+            resultado = almacen.obtener(clave) if clave else None
+    registrar_cache("respuestas_precalculadas", resultado is not None)
+    return resultado
+
+def obtener_indice_sugerencias() -> IndicePrefijos:
+    """
+    Índice de prefijos sobre los términos, ponderado por popularidad.
+    """
+    global indice_sugerencias
+    # El diccionario toma el mismo lock, así que se obtiene antes
+    datos = obtener_diccionario()
+    with lock_carga:
+        if indice_sugerencias is None:
+            popularidad = calcular_popularidad(datos)
+            indice_sugerencias = IndicePrefijos([
+                (clave, entrada["termino"], popularidad.get(clave, 0))
+                for clave, entrada in datos["indice_exacto"].items() if clave
+            ])
+        return indice_sugerencias
+
+def sugerir_terminos(texto: str, limite: int = MAX_SUGERENCIAS) -> List[str]:
+    """
+    Términos del diccionario que completan lo escrito hasta ahora.
+    """
+    with medir("sugerencias"):
+        return obtener_indice_sugerencias().sugerir(normalizar(texto), limite)
+
+def iniciar_precalculo(top_n: int = PRECALCULO_TOP_N, pausa: float = PRECALCULO_PAUSA) -> TrabajadorPrecalculo:
+    """
+    Lanza el trabajador que genera las respuestas precalculadas que faltan.
+    """
+    trabajador = TrabajadorPrecalculo(
+        obtener_almacen_precalculado(),
+        terminos_para_precalcular(obtener_diccionario(), top_n),
+        lambda termino: responder_pregunta(termino, obtener_diccionario(), usar_precalculadas=False),
+        pausa
+    )
+    trabajador.start()
+    return trabajador
 
 # ============================================================
 # GENERACIÓN DE RESPUESTAS
 # ============================================================
 
-def generar_respuesta_ollama(
-        pregunta: str,
-        contexto: str
-) -> str:
+# Instrucciones fijas al principio del prompt: al no cambiar entre
+# peticiones, Ollama reutiliza su caché KV y solo evalúa lo nuevo.
+INSTRUCCIONES_SISTEMA = """Eres un asistente de biodescodificación.
+Responde únicamente con la INFORMACIÓN proporcionada en cada mensaje.
+Responde de forma completa, clara y estructurada, siendo fiel a la INFORMACIÓN proporcionada.
+NO inventes nada, ni te repitas."""
+
+# La indicación de longitud va al final del mensaje del usuario para no
+# cambiar el prefijo fijo (y su caché KV) entre un modo y otro
+INSTRUCCIONES_MODO = {
+    "breve": "Responde de forma breve, en un solo párrafo.",
+    "detallada": "",
+}
 
-    prompt = f"""Eres un asistente de biodescodificación.
+def construir_mensajes(pregunta: str, contexto: str, modo: str = MODO_RESPUESTA) -> List[Dict]:
+    """
+    Mensajes para el modelo: instrucciones estáticas primero, después el
+    contexto y la pregunta, que cambian en cada petición.
+    """
+    contenido = f"INFORMACIÓN:\n{contexto}\nPREGUNTA: {pregunta}"
+    if INSTRUCCIONES_MODO.get(modo):
+        contenido += f"\n{INSTRUCCIONES_MODO[modo]}"
+    return [
+        {"role": "system", "content": INSTRUCCIONES_SISTEMA},
+        {"role": "user", "content": contenido}
+    ]
 
-    INFORMACIÓN:
-    {contexto}
+# ============================================================
+# LONGITUD DE LA RESPUESTA
+# ============================================================
+#
+# Con num_predict fijo en MAX_TOKENS_RESPUESTA una definición de una línea y
+# una comparación entre varias entradas tienen el mismo tope, y las colas de
+# generación largas son la mayor parte del tiempo de CPU. Cada petición lleva
+# su propio presupuesto según el tipo de pregunta, las entradas recuperadas y
+# el modo (breve/detallada), además de secuencias de parada. num_ctx se
+# comparte entre prompt y respuesta: lo que no se reserva para la respuesta,
+# las instrucciones y la pregunta es el presupuesto del contexto.
+
+PALABRAS_COMPARACION = {
+    "diferencia", "diferencias", "diferente", "distingue", "compara", "comparar",
+    "comparacion", "versus", "vs", "frente", "entre", "mientras"
+}
 
-    PREGUNTA: {pregunta}
+def clasificar_pregunta(pregunta: str) -> str:
+    """
+    Tipo de pregunta para el presupuesto de tokens: comparacion, definicion
+    (qué es / qué significa), campo (un campo concreto, p. ej. el conflicto)
+    o general.
+    """
+    texto = limpiar_texto(pregunta)
+    palabras = texto.split()
+    if any(p in PALABRAS_COMPARACION for p in palabras):
+        return "comparacion"
+    campos = campos_pedidos(pregunta)
+    if campos == {"definicion"} or (not campos and re.match(r"(que|cual) (es|son)\b", texto)):
+        return "definicion"
+    if campos:
+        return "campo"
+    return "general"
+
+def presupuesto_contexto(pregunta: str, num_predict: int, modo: str = MODO_RESPUESTA) -> int:
+    """
+    Tokens disponibles para el contexto: num_ctx menos la respuesta
+    (num_predict) y el resto del prompt (instrucciones y pregunta).
+    """
+    prompt = sum(contar_tokens(m["content"]) for m in construir_mensajes(pregunta, "", modo))
+    return max(0, OLLAMA_OPTIONS["num_ctx"] - num_predict - prompt)
 
-    Responde de forma completa, clara y estructurada, siendo fiel a la INFORMACIÓN proporcionada.
-    NO inventes nada, ni te repitas.
-"""
+def opciones_generacion(pregunta: str, num_entradas: int, modo: str = MODO_RESPUESTA) -> Dict:
+    """
+    Opciones de generación de una petición: num_predict según el tipo de
+    pregunta y las entradas del contexto, las secuencias de parada y el
+    presupuesto del contexto que deja esa respuesta.
+    """
+    tipo = clasificar_pregunta(pregunta)
+    tokens = TOKENS_POR_TIPO[tipo] + TOKENS_POR_ENTRADA_EXTRA * max(0, num_entradas - 1)
+    tokens = int(tokens * FACTOR_MODO.get(modo, 1.0))
+    num_predict = max(MIN_TOKENS_RESPUESTA, min(tokens, MAX_TOKENS_RESPUESTA))
+    return {
+        "tipo": tipo,
+        "num_predict": num_predict,
+        "stop": STOP_RESPUESTA,
+        "max_tokens_contexto": presupuesto_contexto(pregunta, num_predict, modo)
+    }
+
+def validar_modo(modo: str) -> str:
+    if modo not in MODOS_RESPUESTA:
+        raise ValueError(f"Modo de respuesta desconocido: {modo} (opciones: {', '.join(MODOS_RESPUESTA)})")
+    return modo
 
+def precalentar_modelo() -> Dict:
+    """
+    Carga el modelo y evalúa las instrucciones fijas para que la primera
+    pregunta no pague la carga ni la evaluación del prefijo.
+    """
+    resultado = obtener_enrutador().precalentar([{"role": "system", "content": INSTRUCCIONES_SISTEMA}])
+    for nombre, metricas in resultado.items():
+        if metricas:
+            logger.info(
+                f"✓ Backend {nombre} precalentado "
+                f"(carga: {metricas['load_ms']} ms, prompt: {metricas['prompt_eval_ms']} ms)"
+            )
+    return resultado
+
+def describir_metricas(metricas: Dict) -> str:
+    """
+    Resumen legible de los tiempos de una generación.
+    """
+    partes = [f"{metricas.get('backend', '?')} {metricas.get('latencia_ms', 0)} ms"]
+    if "load_ms" in metricas:
+        partes.append(f"carga {metricas['load_ms']} ms")
+    if "prompt_eval_ms" in metricas:
+        partes.append(f"prompt {metricas['prompt_eval_ms']} ms ({metricas.get('prompt_eval_count', 0)} tokens)")
+    if "eval_ms" in metricas:
+        partes.append(f"generación {metricas['eval_ms']} ms ({metricas.get('eval_count', 0)} tokens)")
+    if "tokens_por_segundo" in metricas:
+        partes.append(f"{metricas['tokens_por_segundo']} tokens/s")
+    if "num_predict" in metricas:
+        partes.append(f"límite {metricas['num_predict']} tokens ({metricas.get('tipo_pregunta', '?')}, {metricas.get('modo', '?')})")
+    return ", ".join(partes)
+
+def registrar_metricas_generacion(metricas: Dict):
+    """
+    Añade a la traza y a /metrics las fases que reporta el backend.
+    """
+    backend = metricas.get("backend", "?")
+    for fase, campo in (("carga_modelo", "load_ms"), ("prompt_eval", "prompt_eval_ms"), ("generacion", "eval_ms")):
+        if campo in metricas:
+            anotar_span(f"llm_{fase}", metricas[campo] / 1000, backend=backend)
+    for tipo, campo in (("prompt", "prompt_eval_count"), ("generados", "eval_count")):
+        if metricas.get(campo):
+            incrementar("biodesc_llm_tokens_total", metricas[campo], backend=backend, tipo=tipo)
+
+    # Velocidad de generación: con el tiempo de generación del backend si lo
+    # reporta (Ollama), si no con la latencia de toda la llamada (APIs)
+    segundos = (metricas.get("eval_ms") or metricas.get("latencia_ms") or 0) / 1000
+    if metricas.get("eval_count") and segundos:
+        metricas["tokens_por_segundo"] = round(metricas["eval_count"] / segundos, 1)
+    if "num_predict" in metricas:
+        # truncada: la respuesta agotó su presupuesto (puede que demasiado corto)
+        truncada = metricas.get("eval_count", 0) >= metricas["num_predict"]
+        incrementar("biodesc_llm_respuestas_total", backend=backend, tipo=metricas["tipo_pregunta"],
+                    modo=metricas["modo"], truncada="si" if truncada else "no")
+
+def anotar_opciones(metricas: Dict, opciones: Dict, modo: str):
+    metricas.update({"num_predict": opciones["num_predict"], "tipo_pregunta": opciones["tipo"], "modo": modo})
+
+def generar_respuesta(
+        pregunta: str,
+        contexto: str,
+        num_entradas: int = 1,
+        modo: str = MODO_RESPUESTA,
+        opciones: Dict = None
+) -> Tuple[str, Dict]:
+    """
+    Genera la respuesta con el backend que elija el enrutador. Devuelve el
+    texto y las métricas de la llamada. opciones son las de preparar_contexto,
+    con las que se ajustó el contexto; si no se pasan se calculan.
+    """
     try:
-        resp = ollama.chat(
-            model=OLLAMA_MODEL,
-            messages=[
-                {"role": "system", "content": "Responde únicamente con la información proporcionada."},
-                {"role": "user", "content": prompt}
-            ],
-            options=OLLAMA_OPTIONS
-        )
-        return resp["message"]["content"]
+        opciones = opciones or opciones_generacion(pregunta, num_entradas, modo)
+        with medir("generacion_total"):
+            respuesta, metricas = obtener_enrutador().generar(
+                construir_mensajes(pregunta, contexto, modo),
+                {"num_predict": opciones["num_predict"], "stop": opciones["stop"]}
+            )
+        anotar_opciones(metricas, opciones, modo)
+        registrar_metricas_generacion(metricas)
+        logger.info(f"Generación: {describir_metricas(metricas)}")
+        return respuesta, metricas
     except Exception as e:
-        return f"Error al generar respuesta local: {e}"
+        logger.error(f"Error al generar respuesta: {e}")
+        return f"Error al generar respuesta: {e}", {}
 
-def responder_pregunta(pregunta: str, datos_diccionario: Dict) -> Dict:
+RESPUESTA_SIN_RESULTADOS = (
+    "No encontré información específica sobre ese tema en el diccionario. "
+    "¿Podrías reformular tu pregunta o usar términos diferentes?"
+)
+
+def preparar_contexto(
+        pregunta: str,
+        datos_diccionario: Dict,
+        entradas: List[Dict] = None,
+        modo: str = MODO_RESPUESTA
+) -> Dict:
     """
-    Función principal que responde una pregunta.
+    Pasos de recuperación: busca las entradas y construye el contexto con el
+    presupuesto que dejan las opciones de generación, que se devuelven para
+    generar con ellas. Con entradas (las de la sesión) no se busca, solo se
+    construye el contexto.
     """
-    # Paso 1: Buscar entradas relevantes
-    entradas_encontradas = buscar_entradas(pregunta, datos_diccionario, MAX_ENTRADAS_RELEVANTES)
+    if entradas is not None:
+        entradas_encontradas = entradas
+    else:
+        with medir("busqueda"):
+            entradas_encontradas = buscar_entradas(pregunta, datos_diccionario, MAX_ENTRADAS_RELEVANTES)
 
     if not entradas_encontradas:
-        return {
-            "respuesta": "No encontré información específica sobre ese tema en el diccionario. ¿Podrías reformular tu pregunta o usar términos diferentes?",
-            "fuentes": [],
-            "auditoria": None,
-            "es_relevante": False
-        }
+        return {"fuentes": [], "contexto": None, "tokens_contexto": 0}
 
-    # Paso 2: Construir contexto
-    contexto = construir_contexto(entradas_encontradas)
-
-    # Paso 3: Generar respuesta con ChatGPT
-    # respuesta_chatgpt = generar_respuesta_chatgpt(pregunta, contexto)
-    respuesta = generar_respuesta_ollama(pregunta, contexto)
+    opciones = opciones_generacion(pregunta, len(entradas_encontradas), modo)
+    with medir("contexto"):
+        pasajes = seleccionar_pasajes(pregunta, entradas_encontradas, datos_diccionario)
+        contexto, tokens_contexto = construir_contexto(
+            entradas_encontradas, opciones["max_tokens_contexto"], pasajes
+        )
+    logger.debug(f"Contexto: {tokens_contexto} de {opciones['max_tokens_contexto']} tokens estimados")
 
     return {
-        "respuesta": respuesta,
         "fuentes": [e.get("termino") for e in entradas_encontradas],
-        "es_relevante": True
+        "contexto": contexto,
+        "tokens_contexto": tokens_contexto,
+        "opciones": opciones
     }
 
+# Pool de procesos de recuperación del servidor (SERVIDOR_PROCESOS > 0)
+pool_recuperacion = None
+
+def iniciar_pool_recuperacion(procesos: int = SERVIDOR_PROCESOS):
+    """
+    Crea los procesos de recuperación a partir del diccionario ya cargado.
+    Debe llamarse antes de abrir hilos (backends, servidor).
+    """
+    global pool_recuperacion
+    from recuperacion import PoolRecuperacion
+    pool_recuperacion = PoolRecuperacion(
+        obtener_diccionario(), cargar_segun_origen, preparar_contexto, procesos
+    ).arrancar()
+    return pool_recuperacion
+
+def recuperar_contexto(pregunta: str, datos_diccionario: Dict, modo: str = MODO_RESPUESTA) -> Dict:
+    """
+    preparar_contexto en el pool si está activo y la consulta es sobre el
+    diccionario compartido; si no, en el propio proceso.
+    """
+    if pool_recuperacion is not None and datos_diccionario is diccionario_data:
+        return pool_recuperacion.preparar(pregunta, modo)
+    return preparar_contexto(pregunta, datos_diccionario, modo=modo)
+
+# ============================================================
+# CONTEXTO DE LA SESIÓN
+# ============================================================
+#
+# Cada sesión de chat guarda los términos recuperados en el último cambio de
+# tema. Una pregunta de seguimiento ("¿y su sentido biológico?") reutiliza
+# esas entradas en lugar de buscar de nuevo; solo se vuelve a buscar cuando
+# la pregunta menciona otro término del diccionario. Las demás palabras
+# ("¿cómo se manifiesta?") no cambian de tema aunque la búsqueda por
+# keywords les encontrase alguna entrada.
+
+# Palabras que no indican tema: referencias a lo anterior y preguntas
+PALABRAS_SEGUIMIENTO = {
+    "su", "sus", "eso", "esto", "este", "esta", "ese", "esa", "ello", "lo", "le",
+    "tambien", "ademas", "entonces", "mas", "otro", "otra", "otros", "otras",
+    "por", "para", "con", "en", "hay", "tiene", "tienen", "relacion", "relacionado",
+    "explica", "explicame", "dime", "puedes", "quiero", "saber", "caso", "cuando"
+}
+
+def palabras_tema(pregunta: str) -> List[str]:
+    """
+    Palabras de la pregunta que pueden introducir un tema nuevo.
+    """
+    return [
+        singularizar(p) for p in normalizar(pregunta).split()
+        if len(p) > 2
+        and p not in STOPWORDS
+        and p not in PALABRAS_PREGUNTA
+        and p not in PALABRAS_SEGUIMIENTO
+        and p not in PALABRAS_GENERICAS
+        and singularizar(p) not in PALABRAS_CAMPO
+    ]
+
+def entradas_de_sesion(sesion: Dict, datos_diccionario: Dict) -> List[Dict]:
+    indice = datos_diccionario["indice_exacto"]
+    entradas = (indice.get(normalizar(t)) for t in sesion.get("terminos", []))
+    return [e for e in entradas if e is not None]
+
+def es_termino_diccionario(palabra: str, datos_diccionario: Dict) -> bool:
+    """
+    La palabra (singularizada) es un término, el núcleo de alguno o una
+    palabra de algún término. Se prueban también sus posibles plurales, que
+    es como puede aparecer en los términos.
+    """
+    return any(
+        forma in datos_diccionario["indice_exacto"]
+        or forma in datos_diccionario["indice_nucleos"]
+        or forma in datos_diccionario["indice_palabras"]
+        for forma in (palabra, f"{palabra}s", f"{palabra}es")
+    )
+
+def es_seguimiento(pregunta: str, entradas: List[Dict], datos_diccionario: Dict) -> bool:
+    """
+    La pregunta sigue con el tema de la sesión si no menciona ningún término
+    del diccionario fuera de los ya recuperados.
+    """
+    vocabulario = {
+        singularizar(p) for e in entradas for p in normalizar(e.get("termino", "")).split()
+    }
+    return not any(
+        es_termino_diccionario(p, datos_diccionario)
+        for p in palabras_tema(pregunta) if p not in vocabulario
+    )
+
+def continua_sesion(pregunta: str, datos_diccionario: Dict, sesion: Dict = None) -> bool:
+    """
+    La pregunta sigue con el tema de la sesión: se responde con sus entradas y
+    no con una respuesta precalculada ('¿y el conflicto?' tras 'estómago').
+    """
+    if not sesion:
+        return False
+    entradas = entradas_de_sesion(sesion, datos_diccionario)
+    return bool(entradas) and es_seguimiento(pregunta, entradas, datos_diccionario)
+
+def recuperar_con_sesion(
+        pregunta: str,
+        datos_diccionario: Dict,
+        sesion: Dict = None,
+        modo: str = MODO_RESPUESTA
+) -> Dict:
+    """
+    recuperar_contexto con la caché de la sesión: las preguntas de
+    seguimiento reutilizan sus entradas y los cambios de tema la actualizan.
+    Si un tema nuevo no encuentra nada se siguen usando las de la sesión.
+    """
+    if sesion is None:
+        return recuperar_contexto(pregunta, datos_diccionario, modo)
+
+    entradas = entradas_de_sesion(sesion, datos_diccionario)
+    seguimiento = bool(entradas) and es_seguimiento(pregunta, entradas, datos_diccionario)
+    registrar_cache("contexto_sesion", seguimiento)
+
+    if not seguimiento:
+        preparado = recuperar_contexto(pregunta, datos_diccionario, modo)
+        if preparado["fuentes"] or not entradas:
+            if preparado["fuentes"]:
+                sesion["terminos"] = preparado["fuentes"]
+            return preparado
+
+    # Solo las entradas principales: el seguimiento es sobre el tema central
+    with medir("contexto_sesion"):
+        preparado = preparar_contexto(pregunta, datos_diccionario, entradas[:MAX_ENTRADAS_SEGUIMIENTO], modo)
+    preparado["seguimiento"] = True
+    return preparado
+
+def responder_pregunta(
+        pregunta: str,
+        datos_diccionario: Dict,
+        usar_precalculadas: bool = True,
+        sesion: Dict = None,
+        modo: str = MODO_RESPUESTA
+) -> Dict:
+    """
+    Función principal que responde una pregunta. Con sesion (estado del chat)
+    las preguntas de seguimiento reutilizan las entradas de turnos anteriores.
+    modo (breve/detallada) ajusta la longitud de la respuesta.
+    """
+    modo = validar_modo(modo)
+    with traza("pregunta", modo=modo) as datos_traza:
+        # Paso 0: Respuesta precalculada para términos sueltos (se generan en
+        # el modo por defecto, así que solo sirven para ese modo), salvo en
+        # las preguntas de seguimiento de la sesión
+        usar_precalculadas = (
+            usar_precalculadas and modo == MODO_RESPUESTA
+            and not continua_sesion(pregunta, datos_diccionario, sesion)
+        )
+        precalculada = buscar_precalculada(pregunta, datos_diccionario) if usar_precalculadas else None
+        if precalculada:
+            datos_traza["precalculada"] = True
+            if sesion is not None:
+                sesion["terminos"] = precalculada["fuentes"]
+            return {
+                "respuesta": precalculada["respuesta"],
+                "fuentes": precalculada["fuentes"],
+                "metricas": {"backend": "precalculada"},
+                "es_relevante": True
+            }
+
+        # Pasos 1 y 2: Buscar entradas relevantes y construir contexto
+        preparado = recuperar_con_sesion(pregunta, datos_diccionario, sesion, modo)
+        datos_traza["entradas"] = len(preparado["fuentes"])
+        datos_traza["seguimiento"] = preparado.get("seguimiento", False)
+
+        if not preparado["fuentes"]:
+            return {
+                "respuesta": RESPUESTA_SIN_RESULTADOS,
+                "fuentes": [],
+                "auditoria": None,
+                "es_relevante": False
+            }
+        datos_traza["tokens_contexto"] = preparado["tokens_contexto"]
+
+        # Paso 3: Generar respuesta (Ollama u otro backend según LLM_BACKENDS)
+        respuesta, metricas = generar_respuesta(
+            pregunta, preparado["contexto"], len(preparado["fuentes"]), modo, preparado["opciones"]
+        )
+        for campo in ("tipo_pregunta", "num_predict", "eval_count", "tokens_por_segundo"):
+            if campo in metricas:
+                datos_traza[campo] = metricas[campo]
+
+        return {
+            "respuesta": respuesta,
+            "fuentes": preparado["fuentes"],
+            "tokens_contexto": preparado["tokens_contexto"],
+            "metricas": metricas,
+            "es_relevante": True
+        }
+
+def responder_pregunta_stream(
+        pregunta: str,
+        datos_diccionario: Dict,
+        sesion: Dict = None,
+        modo: str = MODO_RESPUESTA
+) -> Iterator[Dict]:
+    """
+    Igual que responder_pregunta pero en eventos: primero las fuentes, luego
+    los fragmentos de la respuesta según se generan y al final las métricas.
+    """
+    modo = validar_modo(modo)
+    # Una sola traza para toda la respuesta: se activa en los tramos entre
+    # fragmentos y se emite al terminar (o al cortarse el stream)
+    datos_traza = nueva_traza("pregunta_stream", modo=modo)
+    inicio = time.perf_counter()
+    try:
+        with en_traza(datos_traza):
+            usar_precalculadas = modo == MODO_RESPUESTA and not continua_sesion(pregunta, datos_diccionario, sesion)
+            precalculada = buscar_precalculada(pregunta, datos_diccionario) if usar_precalculadas else None
+            if precalculada:
+                datos_traza["precalculada"] = True
+                if sesion is not None:
+                    sesion["terminos"] = precalculada["fuentes"]
+            else:
+                preparado = recuperar_con_sesion(pregunta, datos_diccionario, sesion, modo)
+                datos_traza["entradas"] = len(preparado["fuentes"])
+                datos_traza["seguimiento"] = preparado.get("seguimiento", False)
+
+        if precalculada:
+            yield {"tipo": "fuentes", "fuentes": precalculada["fuentes"], "tokens_contexto": 0}
+            yield {"tipo": "fragmento", "texto": precalculada["respuesta"]}
+            yield {"tipo": "fin", "es_relevante": True, "metricas": {"backend": "precalculada"}}
+            return
+
+        yield {"tipo": "fuentes", "fuentes": preparado["fuentes"], "tokens_contexto": preparado["tokens_contexto"]}
+
+        if not preparado["fuentes"]:
+            yield {"tipo": "fragmento", "texto": RESPUESTA_SIN_RESULTADOS}
+            yield {"tipo": "fin", "es_relevante": False, "metricas": {}}
+            return
+        datos_traza["tokens_contexto"] = preparado["tokens_contexto"]
+
+        metricas = {}
+        opciones = preparado["opciones"]
+        inicio_generacion = time.perf_counter()
+        try:
+            for fragmento in obtener_enrutador().generar_stream(
+                    construir_mensajes(pregunta, preparado["contexto"], modo),
+                    {"num_predict": opciones["num_predict"], "stop": opciones["stop"]},
+                    metricas=metricas
+            ):
+                yield {"tipo": "fragmento", "texto": fragmento}
+        except Exception as e:
+            logger.error(f"Error al generar respuesta: {e}")
+            datos_traza["error"] = repr(e)
+            yield {"tipo": "error", "mensaje": f"Error al generar respuesta: {e}"}
+            return
+
+        with en_traza(datos_traza):
+            anotar_span("generacion_total", time.perf_counter() - inicio_generacion)
+            anotar_opciones(metricas, opciones, modo)
+            registrar_metricas_generacion(metricas)
+        for campo in ("tipo_pregunta", "num_predict", "eval_count", "tokens_por_segundo"):
+            if campo in metricas:
+                datos_traza[campo] = metricas[campo]
+        yield {"tipo": "fin", "es_relevante": True, "metricas": metricas}
+    except Exception as e:
+        datos_traza["error"] = repr(e)
+        raise
+    finally:
+        emitir_traza(datos_traza, time.perf_counter() - inicio)
+
+
+def medidores_cache() -> List[Tuple[str, Dict, float]]:
+    """
+    Tasa de aciertos de las cachés de normalización para /metrics.
+    """
+    valores = []
+    for nombre, funcion in (("normalizar", normalizar), ("limpiar_texto", limpiar_texto)):
+        info = funcion.cache_info()
+        total = info.hits + info.misses
+        valores.append(("biodesc_cache_tasa_aciertos", {"cache": nombre}, info.hits / total if total else 0.0))
+        valores.append(("biodesc_cache_tamano", {"cache": nombre}, info.currsize))
+    return valores
+
+def medidores_backends() -> List[Tuple[str, Dict, float]]:
+    """
+    Latencias recientes y tasa de error de cada backend para /metrics.
+    """
+    valores = []
+    for nombre, resumen in obtener_enrutador().resumen().items():
+        for campo in ("p50_ms", "p95_ms"):
+            if resumen[campo] is not None:
+                valores.append((f"biodesc_backend_{campo}", {"backend": nombre}, resumen[campo]))
+        valores.append(("biodesc_backend_tasa_error", {"backend": nombre}, resumen["tasa_error"]))
+    return valores
+
+registrar_medidor(medidores_cache)
+registrar_medidor(medidores_backends)
+
 
 # ============================================================
 # INTERFAZ GRADIO
@@ -335,7 +1087,8 @@ def chat_con_diccionario(mensaje: str, estado_chat: Dict) -> Dict:
 
     resultado = responder_pregunta(
         mensaje,
-        diccionario_data
+        obtener_diccionario(),
+        sesion=estado_chat
     )
     # Añadir respuesta al historial
     estado_chat["historial"].append(f"Usuario: {mensaje}")
@@ -358,15 +1111,22 @@ def chat_con_diccionario(mensaje: str, estado_chat: Dict) -> Dict:
     return respuesta_completa, estado_chat
 
 
-def chat_fn(mensaje: str, historia: List[Dict]) -> Tuple[str, List[Dict]]:
+def chat_fn(
+        mensaje: str,
+        historia: List[Dict],
+        sesion: Dict,
+        modo: str = MODO_RESPUESTA
+) -> Tuple[str, List[Dict], Dict]:
     """
-    Función del chat con formato de mensajes (Gradio moderno).
+    Función del chat con formato de mensajes (Gradio moderno). sesion es el
+    estado de la conversación (términos recuperados) de cada usuario.
     """
+    sesion = sesion if sesion is not None else {}
     if not mensaje or not mensaje.strip():
-        return "", historia
+        return "", historia, sesion
 
     # Generar respuesta
-    resultado = responder_pregunta(mensaje, diccionario_data)
+    resultado = responder_pregunta(mensaje, obtener_diccionario(), sesion=sesion, modo=modo)
 
     # Construir respuesta con fuentes
     fuentes = ""
@@ -381,23 +1141,26 @@ def chat_fn(mensaje: str, historia: List[Dict]) -> Tuple[str, List[Dict]]:
     historia.append(mensaje_user)
     historia.append(mensaje_assistant)
 
-    return "", historia  # Limpia el input, devuelve el historial actualizado
+    return "", historia, sesion  # Limpia el input, devuelve el historial actualizado
 
-def limpiar_fn() -> List[Dict]:
+def limpiar_fn() -> Tuple[List[Dict], Dict]:
     """
-    Limpia el historial del chat.
+    Limpia el historial del chat y el contexto de la sesión.
     """
-    return []
+    return [], {}
 
 def crear_interfaz():
+    import gradio as gr
+
     with gr.Blocks(title="Chat Biodescodificación (mossa 2026)") as interfaz:
         gr.Markdown("# 🧬 Chat de Biodescodificación (mossa 2026)")
-        gr.Markdown(f"📚 Diccionario cargado: {diccionario_data['total']} entradas")
+        gr.Markdown(f"📚 Diccionario cargado: {obtener_diccionario()['total']} entradas")
 
         chat = gr.Chatbot(
             label="Conversación",
             height=400
         )
+        sesion = gr.State({})
 
         mensaje = gr.Textbox(
             label="Tu pregunta",
@@ -405,6 +1168,19 @@ def crear_interfaz():
             scale=4
         )
 
+        # Sugerencias: elegir un término lo copia al cuadro de la pregunta
+        sugerencias = gr.Dropdown(
+            choices=[],
+            label="Términos del diccionario",
+            allow_custom_value=True
+        )
+
+        modo = gr.Radio(
+            choices=list(MODOS_RESPUESTA),
+            value=MODO_RESPUESTA,
+            label="Respuesta"
+        )
+
         with gr.Row():
             boton_enviar = gr.Button("Enviar", variant="primary", scale=1)
             boton_limpiar = gr.Button("Limpiar", variant="secondary", scale=1)
@@ -424,23 +1200,98 @@ def crear_interfaz():
         # Conectar eventos
         boton_enviar.click(
             fn=chat_fn,
-            inputs=[mensaje, chat],
-            outputs=[mensaje, chat]
+            inputs=[mensaje, chat, sesion, modo],
+            outputs=[mensaje, chat, sesion]
         )
 
         mensaje.submit(
             fn=chat_fn,
-            inputs=[mensaje, chat],
-            outputs=[mensaje, chat]
+            inputs=[mensaje, chat, sesion, modo],
+            outputs=[mensaje, chat, sesion]
         )
 
         boton_limpiar.click(
             fn=limpiar_fn,
-            outputs=chat
+            outputs=[chat, sesion]
+        )
+
+        mensaje.input(
+            fn=lambda texto: gr.Dropdown(choices=sugerir_terminos(texto), value=None),
+            inputs=mensaje,
+            outputs=sugerencias,
+            trigger_mode="always_last",
+            show_progress="hidden"
+        )
+
+        sugerencias.select(
+            fn=lambda termino: termino,
+            inputs=sugerencias,
+            outputs=mensaje
         )
 
     return interfaz
 
+def crear_api():
+    """
+    Aplicación FastAPI sin interfaz: API JSON en /api y métricas en /metrics.
+
+    POST /api/preguntar         {"pregunta": "...", "modo": "breve"} -> resultado de responder_pregunta
+    POST /api/preguntar/stream  {"pregunta": "...", "modo": "breve"} -> eventos NDJSON (fuentes, fragmento, fin)
+    GET  /api/sugerencias?q=... -> términos del diccionario que empiezan por q
+    """
+    from fastapi import FastAPI, HTTPException, Query
+    from fastapi.responses import PlainTextResponse, StreamingResponse
+    from pydantic import BaseModel
+
+    class Consulta(BaseModel):
+        pregunta: str
+        modo: Literal[MODOS_RESPUESTA] = MODO_RESPUESTA
+
+    def validar(consulta: Consulta) -> str:
+        pregunta = consulta.pregunta.strip()
+        if not pregunta:
+            raise HTTPException(status_code=400, detail="La pregunta está vacía")
+        return pregunta
+
+    app = FastAPI(title="Chat Biodescodificación")
+
+    @app.get("/metrics")
+    def metrics():
+        return PlainTextResponse(exportar_prometheus(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/api/salud")
+    def salud():
+        return {
+            "estado": "ok",
+            "entradas": obtener_diccionario()["total"],
+            "procesos_recuperacion": pool_recuperacion.procesos if pool_recuperacion else 0
+        }
+
+    @app.get("/api/sugerencias")
+    def sugerencias(q: str = "", limite: int = Query(MAX_SUGERENCIAS, ge=1, le=50)):
+        return {"sugerencias": sugerir_terminos(q, limite)}
+
+    @app.post("/api/preguntar")
+    def preguntar(consulta: Consulta):
+        return responder_pregunta(validar(consulta), obtener_diccionario(), modo=consulta.modo)
+
+    @app.post("/api/preguntar/stream")
+    def preguntar_stream(consulta: Consulta):
+        eventos = responder_pregunta_stream(validar(consulta), obtener_diccionario(), modo=consulta.modo)
+        return StreamingResponse(
+            (json.dumps(e, ensure_ascii=False) + "\n" for e in eventos),
+            media_type="application/x-ndjson"
+        )
+
+    return app
+
+def crear_app():
+    """
+    Aplicación completa: la interfaz Gradio montada junto a la API y /metrics.
+    """
+    import gradio as gr
+    return gr.mount_gradio_app(crear_api(), crear_interfaz(), path="/")
+
 # ============================================================
 # MODO CONSOLA (alternativo)
 # ============================================================
@@ -454,7 +1305,7 @@ def modo_consola():
     print("=" * 50)
     print("Escribe 'salir' para terminar\n")
 
-    # historial = []
+    sesion = {}
 
     while True:
         pregunta = input("Tu pregunta: ").strip()
@@ -467,7 +1318,7 @@ def modo_consola():
             continue
 
         print("\nBuscando información...")
-        resultado = responder_pregunta(pregunta, diccionario_data)
+        resultado = responder_pregunta(pregunta, obtener_diccionario(), sesion=sesion)
 
         print("\n" + "=" * 50)
         print("RESPUESTA:")
@@ -477,6 +1328,9 @@ def modo_consola():
         if resultado["fuentes"]:
             print(f"\nFuentes: {', '.join(resultado['fuentes'])}")
 
+        if resultado.get("metricas"):
+            print(f"Tiempos: {describir_metricas(resultado['metricas'])}")
+
         if resultado.get("auditoria"):
             nota = resultado["auditoria"].get("nota_final", "?")
             print(f"Evaluación: {nota}/10")
@@ -490,8 +1344,36 @@ def modo_consola():
 if __name__ == "__main__":
     import sys
 
+    # Solo al ejecutar la aplicación: importar main (pruebas, benchmarks,
+    # herramientas) no toca el logging de quien lo importa
+    configurar_logging()
+
+    # El pool se crea con fork antes de que existan hilos en el proceso
+    modo_servidor = len(sys.argv) < 2 or sys.argv[1] == "--api"
+    if modo_servidor:
+        obtener_diccionario()
+    if modo_servidor and SERVIDOR_PROCESOS > 0:
+        iniciar_pool_recuperacion()
+
+    precalentar_modelo()
+
     if len(sys.argv) > 1 and sys.argv[1] == "--console":
         modo_consola()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        from lote import main_lote
+        main_lote(sys.argv[2:], obtener_diccionario(), cargar_segun_origen, preparar_contexto, generar_respuesta)
+    elif len(sys.argv) > 1 and sys.argv[1] == "--precalcular":
+        # --precalcular [N]: genera y guarda las respuestas de los N términos más citados
+        top_n = int(sys.argv[2]) if len(sys.argv) > 2 else PRECALCULO_TOP_N
+        iniciar_precalculo(top_n, pausa=0).join()
     else:
-        interface = crear_interfaz()
-        interface.launch(server_name="0.0.0.0", server_port=7860, share=True)
+        if PRECALCULO_EN_SEGUNDO_PLANO:
+            iniciar_precalculo()
+
+        # --api: solo la API HTTP, sin interfaz Gradio (pruebas de carga, integraciones)
+        import uvicorn
+        uvicorn.run(
+            crear_api() if "--api" in sys.argv else crear_app(),
+            host=os.getenv("GRADIO_SERVER_NAME", "0.0.0.0"),
+            port=int(os.getenv("GRADIO_SERVER_PORT", "7860"))
+        )
@@ -0,0 +1,204 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Tuple
+from config import *
+
+# ============================================================
+# LOGGING
+# ============================================================
+
+logger = logging.getLogger("biodesc")
+logger_trazas = logging.getLogger("biodesc.trazas")
+
+def configurar_logging(nivel: str = LOG_LEVEL):
+    """
+    Logging por niveles para la aplicación. Las trazas de cada petición se
+    emiten como una línea JSON en el logger biodesc.trazas.
+    """
+    logging.basicConfig(
+        level=getattr(logging, nivel.upper(), logging.INFO),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+
+# ============================================================
+# REGISTRO DE MÉTRICAS
+# ============================================================
+
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                    1, 2.5, 5, 10, 30, 60, 120)
+
+AYUDA = {
+    "biodesc_span_segundos": "Duración de cada fase de una petición",
+    "biodesc_peticion_segundos": "Duración total de una petición",
+    "biodesc_llm_tokens_total": "Tokens evaluados y generados por el backend",
+    "biodesc_llm_respuestas_total": "Respuestas generadas por tipo de pregunta, modo y si agotaron num_predict",
+    "biodesc_cache_consultas_total": "Consultas a cachés por resultado",
+}
+
+lock = threading.Lock()
+contadores: Dict[Tuple, float] = {}
+histogramas: Dict[Tuple, Dict] = {}
+medidores: List[Callable[[], List[Tuple[str, Dict, float]]]] = []
+
+def clave_metrica(nombre: str, etiquetas: Dict) -> Tuple:
+    return nombre, tuple(sorted(etiquetas.items()))
+
+def incrementar(nombre: str, valor: float = 1.0, **etiquetas):
+    clave = clave_metrica(nombre, etiquetas)
+    with lock:
+        contadores[clave] = contadores.get(clave, 0.0) + valor
+
+def observar(nombre: str, valor: float, **etiquetas):
+    clave = clave_metrica(nombre, etiquetas)
+    with lock:
+        h = histogramas.get(clave)
+        if h is None:
+            h = histogramas[clave] = {"buckets": [0] * len(BUCKETS_SEGUNDOS), "suma": 0.0, "cuenta": 0}
+        for i, limite in enumerate(BUCKETS_SEGUNDOS):
+            if valor <= limite:
+                h["buckets"][i] += 1
+        h["suma"] += valor
+        h["cuenta"] += 1
+
+def registrar_cache(cache: str, acierto: bool):
+    incrementar("biodesc_cache_consultas_total", cache=cache, resultado="acierto" if acierto else "fallo")
+
+def registrar_medidor(funcion: Callable[[], List[Tuple[str, Dict, float]]]):
+    """
+    Registra una función que devuelve medidores (nombre, etiquetas, valor)
+    calculados en el momento de exportar, p. ej. estadísticas de lru_cache.
+    """
+    medidores.append(funcion)
+
+# ============================================================
+# TRAZAS
+# ============================================================
+
+traza_actual: ContextVar = ContextVar("traza_actual", default=None)
+
+def anotar_span(nombre: str, segundos: float, **atributos):
+    """
+    Registra una fase ya medida (p. ej. tiempos que devuelve Ollama).
+    """
+    observar("biodesc_span_segundos", segundos, span=nombre)
+    traza = traza_actual.get()
+    if traza is not None:
+        traza["spans"].append({"span": nombre, "ms": round(segundos * 1000, 2), **atributos})
+
+@contextmanager
+def medir(nombre: str):
+    """
+    Mide una fase de la petición en curso.
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        anotar_span(nombre, time.perf_counter() - inicio)
+
+def nueva_traza(nombre: str, **atributos) -> Dict:
+    return {"traza": nombre, **atributos, "spans": []}
+
+@contextmanager
+def en_traza(datos: Dict):
+    """
+    Activa una traza para que medir y anotar_span registren en ella. Una
+    respuesta en streaming la activa en cada tramo entre fragmentos, sin
+    mantenerla activa mientras el generador está suspendido.
+    """
+    token = traza_actual.set(datos)
+    try:
+        yield datos
+    finally:
+        traza_actual.reset(token)
+
+def emitir_traza(datos: Dict, total: float):
+    """
+    Registra la duración total de la petición y emite la traza como JSON.
+    """
+    datos["total_ms"] = round(total * 1000, 2)
+    observar("biodesc_peticion_segundos", total, traza=datos["traza"])
+    logger_trazas.info(json.dumps(datos, ensure_ascii=False, default=str))
+
+@contextmanager
+def traza(nombre: str, **atributos):
+    """
+    Agrupa las fases de una petición y al terminar registra su duración total
+    y emite la traza completa como JSON.
+    """
+    datos = nueva_traza(nombre, **atributos)
+    inicio = time.perf_counter()
+    try:
+        with en_traza(datos):
+            yield datos
+    except Exception as e:
+        datos["error"] = repr(e)
+        raise
+    finally:
+        emitir_traza(datos, time.perf_counter() - inicio)
+
+# ============================================================
+# EXPORTACIÓN PROMETHEUS
+# ============================================================
+
+def escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def formatear_etiquetas(etiquetas, extra: Dict = None) -> str:
+    pares = list(etiquetas) + list((extra or {}).items())
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{escapar(v)}"' for k, v in pares) + "}"
+
+def exportar_prometheus() -> str:
+    """
+    Todas las métricas en formato de texto de Prometheus.
+    """
+    lineas = []
+    vistos = set()
+
+    def cabecera(nombre, tipo):
+        if nombre not in vistos:
+            vistos.add(nombre)
+            if nombre in AYUDA:
+                lineas.append(f"# HELP {nombre} {AYUDA[nombre]}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+
+    with lock:
+        copia_contadores = dict(contadores)
+        copia_histogramas = {k: {**h, "buckets": list(h["buckets"])} for k, h in histogramas.items()}
+
+    for (nombre, etiquetas), valor in sorted(copia_contadores.items()):
+        cabecera(nombre, "counter")
+        lineas.append(f"{nombre}{formatear_etiquetas(etiquetas)} {valor}")
+
+    for (nombre, etiquetas), h in sorted(copia_histogramas.items()):
+        cabecera(nombre, "histogram")
+        for limite, cuenta in zip(BUCKETS_SEGUNDOS, h["buckets"]):
+            lineas.append(f"{nombre}_bucket{formatear_etiquetas(etiquetas, {'le': limite})} {cuenta}")
+        lineas.append(f"{nombre}_bucket{formatear_etiquetas(etiquetas, {'le': '+Inf'})} {h['cuenta']}")
+        lineas.append(f"{nombre}_sum{formatear_etiquetas(etiquetas)} {h['suma']}")
+        lineas.append(f"{nombre}_count{formatear_etiquetas(etiquetas)} {h['cuenta']}")
+
+    # Cada familia debe salir seguida: los medidores devuelven sus valores
+    # intercalados (tasa y tamaño de cada caché), así que se agrupan por nombre
+    familias: Dict[str, List[Tuple[Dict, float]]] = {}
+    for funcion in medidores:
+        try:
+            valores = funcion()
+        except Exception as e:
+            logger.warning(f"Error calculando medidores: {e}")
+            continue
+        for nombre, etiquetas, valor in valores:
+            familias.setdefault(nombre, []).append((etiquetas, valor))
+
+    for nombre, valores in familias.items():
+        cabecera(nombre, "gauge")
+        for etiquetas, valor in valores:
+            lineas.append(f"{nombre}{formatear_etiquetas(sorted(etiquetas.items()))} {valor}")
+
+    return "\n".join(lineas) + "\n"
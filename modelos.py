@@ -0,0 +1,28 @@
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+
+# ============================================================
+# MODELOS PYDANTIC DEL DICCIONARIO
+# ============================================================
+
+class EntradaDiccionario(BaseModel):
+    """Modelo para una entrada del diccionario"""
+    model_config = ConfigDict(str_strip_whitespace=True)
+
+    termino: str = Field(min_length=1)
+    definicion: str = ""
+    tecnico: str = ""
+    sentido_biologico: str = ""
+    conflicto: str = ""
+    referencias_cruzadas: List[str] = Field(default_factory=list)
+    # La extracción por chunks no conserva las páginas de cada entrada
+    pagina_inicio: Optional[int] = None
+    pagina_fin: Optional[int] = None
+
+
+class SeccionExtraida(BaseModel):
+    """Modelo para una sección extraída del PDF"""
+    nombre_seccion: str
+    paginas: str
+    contenido_raw: str
+    entradas: List[EntradaDiccionario]
@@ -0,0 +1,138 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Tuple
+from config import *
+
+# ============================================================
+# NORMALIZACIÓN DE TEXTOS E ÍNDICES DEL DICCIONARIO
+# ============================================================
+#
+# Lo que comparten la búsqueda del chat (main), la exportación a SQLite y la
+# compactación de la extracción: normalización de términos, núcleo semántico
+# de una clave, texto de búsqueda de una entrada y división en pasajes. Sin
+# efectos al importar, para que otros servicios lo usen sin cargar el chat.
+
+# Las entradas se normalizan en cada búsqueda por keywords: cachear evita
+# repetir el trabajo sobre los mismos textos
+@lru_cache(maxsize=TAMANO_CACHE_NORMALIZACION)
+def normalizar(texto: str) -> str:
+    texto = texto.lower()
+    texto = unicodedata.normalize("NFD", texto)
+    texto = "".join(c for c in texto if unicodedata.category(c) != "Mn")
+    texto = re.sub(r"[\d\-_/]", " ", texto)
+    texto = re.sub(r"[^a-z\s]", " ", texto)
+    texto = re.sub(r"\s+", " ", texto)
+    return texto.strip()
+
+def singularizar(palabra: str) -> str:
+    if palabra.endswith("es"):
+        return palabra[:-2]
+    if palabra.endswith("s"):
+        return palabra[:-1]
+    return palabra
+
+PALABRAS_GENERICAS = {
+    "problema", "problemas",
+    "emocion", "emociones",
+    "conflicto", "conflictos",
+    "trastorno", "trastornos",
+    "alteracion", "alteraciones",
+    "sintoma", "sintomas"
+}
+
+def nucleo_de(clave: str) -> str:
+    """
+    Núcleo semántico de una clave normalizada: su primera palabra, salvo que
+    sea corta o genérica ('conflicto', 'problemas'...), en cuyo caso "".
+    """
+    nucleo = clave.split()[0] if clave else ""
+    if len(nucleo) < 5 or nucleo in PALABRAS_GENERICAS:
+        return ""
+    return nucleo
+
+def texto_busqueda(entrada: Dict) -> str:
+    """
+    Texto normalizado de una entrada en el que busca la estrategia de keywords.
+    """
+    return limpiar_texto(normalizar(" ".join([
+        entrada.get("termino", ""),
+        entrada.get("definicion", ""),
+        entrada.get("conflicto", ""),
+        entrada.get("sentido_biologico", ""),
+        entrada.get("tecnico", "")
+    ])))
+
+STOPWORDS = {
+    "se", "puede", "ser", "a", "la", "el", "los", "las",
+    "un", "una", "de", "que", "y", "o", "es"
+}
+
+@lru_cache(maxsize=TAMANO_CACHE_NORMALIZACION)
+def limpiar_texto(texto: str) -> str:
+    texto = texto.lower()
+    texto = unicodedata.normalize("NFD", texto)
+    texto = "".join(c for c in texto if unicodedata.category(c) != "Mn")
+    texto = re.sub(r"[^a-z0-9\s]", " ", texto)
+    texto = re.sub(r"\s+", " ", texto).strip()
+    return texto
+
+# ============================================================
+# PASAJES
+# ============================================================
+
+# Orden de prioridad de los campos al repartir el presupuesto de tokens
+CAMPOS_CONTEXTO = [
+    ("definicion", "Definición"),
+    ("conflicto", "Conflicto"),
+    ("sentido_biologico", "Sentido Biológico"),
+    ("tecnico", "Técnico"),
+]
+
+def dividir_en_frases(texto: str) -> List[str]:
+    """
+    Divide un texto en frases (por signos de fin de frase y saltos de línea).
+    """
+    frases = []
+    for parrafo in texto.split("\n"):
+        for frase in re.split(r"(?<=[.!?…])\s+", parrafo.strip()):
+            if frase:
+                frases.append(frase)
+    return frases
+
+def terminos_pasaje(texto: str) -> set:
+    """
+    Términos normalizados y singularizados con los que se puntúa un pasaje.
+    """
+    return {
+        singularizar(p) for p in limpiar_texto(texto).split()
+        if p not in STOPWORDS and len(p) > 3
+    }
+
+def indexar_pasajes(entradas: List[Dict]) -> Tuple[Dict, Dict]:
+    """
+    Divide los campos de cada entrada en ventanas de PASAJE_FRASES frases.
+    Devuelve el índice de pasajes por entrada (id) y la frecuencia de
+    cada término en pasajes, para ponderar por rareza.
+    """
+    indice_pasajes = {}
+    frecuencia = {}
+
+    for entrada in entradas:
+        pasajes = []
+        for campo, _ in CAMPOS_CONTEXTO:
+            frases = dividir_en_frases(entrada.get(campo) or "")
+            for orden, inicio in enumerate(range(0, len(frases), PASAJE_FRASES)):
+                texto = " ".join(frases[inicio:inicio + PASAJE_FRASES])
+                terminos = terminos_pasaje(texto)
+                pasajes.append({
+                    "campo": campo,
+                    "orden": orden,
+                    "texto": texto,
+                    "terminos": terminos
+                })
+                for t in terminos:
+                    frecuencia[t] = frecuencia.get(t, 0) + 1
+        indice_pasajes[id(entrada)] = pasajes
+
+    return indice_pasajes, frecuencia
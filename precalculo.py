@@ -0,0 +1,112 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from metricas import logger
+from config import *
+
+# ============================================================
+# RESPUESTAS PRECALCULADAS
+# ============================================================
+#
+# Las consultas más frecuentes son un único término del diccionario. Sus
+# respuestas se generan por adelantado (con el mismo responder_pregunta que
+# el chat) y se sirven al instante; todo lo demás sigue en generación en vivo.
+
+class AlmacenPrecalculado:
+    """Respuestas precalculadas por término normalizado, persistidas en JSON"""
+
+    def __init__(self, ruta: str = RESPUESTAS_PRECALCULADAS_JSON):
+        self.ruta = ruta
+        self.respuestas: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+        self.cargar()
+
+    def cargar(self):
+        try:
+            with open(self.ruta, 'r', encoding='utf-8') as f:
+                respuestas = json.load(f)
+        except FileNotFoundError:
+            return
+        with self.lock:
+            self.respuestas = respuestas
+        logger.info(f"✓ Respuestas precalculadas: {len(respuestas)}")
+
+    def guardar(self):
+        """
+        Escritura atómica: un fichero temporal que sustituye al anterior.
+        """
+        with self.lock:
+            contenido = json.dumps(self.respuestas, ensure_ascii=False, indent=2)
+        temporal = f"{self.ruta}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            f.write(contenido)
+        os.replace(temporal, self.ruta)
+
+    def obtener(self, clave: str) -> Optional[Dict]:
+        return self.respuestas.get(clave)
+
+    def anadir(self, clave: str, resultado: Dict):
+        with self.lock:
+            self.respuestas[clave] = resultado
+
+    def __contains__(self, clave: str) -> bool:
+        return clave in self.respuestas
+
+    def __len__(self) -> int:
+        return len(self.respuestas)
+
+
+class TrabajadorPrecalculo(threading.Thread):
+    """
+    Genera en segundo plano las respuestas que faltan, una a una y con una
+    pausa entre ellas para no competir con las peticiones en vivo.
+    """
+
+    def __init__(
+            self,
+            almacen: AlmacenPrecalculado,
+            terminos: List[Tuple[str, str]],
+            responder: Callable[[str], Dict],
+            pausa: float = PRECALCULO_PAUSA,
+            guardar_cada: int = 10
+    ):
+        super().__init__(name="precalculo", daemon=True)
+        self.almacen = almacen
+        self.terminos = terminos
+        self.responder = responder
+        self.pausa = pausa
+        self.guardar_cada = guardar_cada
+        self.detener = threading.Event()
+        self.generadas = 0
+        self.errores = 0
+
+    def run(self):
+        pendientes = [(c, t) for c, t in self.terminos if c not in self.almacen]
+        logger.info(f"Precálculo: {len(pendientes)} términos pendientes de {len(self.terminos)}")
+
+        for clave, termino in pendientes:
+            if self.detener.is_set():
+                break
+            resultado = self.responder(termino)
+            # Sin métricas la generación falló: no se guarda para reintentar
+            if resultado.get("es_relevante") and resultado.get("metricas"):
+                self.almacen.anadir(clave, {
+                    "termino": termino,
+                    "respuesta": resultado["respuesta"],
+                    "fuentes": resultado["fuentes"],
+                    "backend": resultado["metricas"].get("backend"),
+                    "fecha": datetime.now().isoformat(timespec="seconds")
+                })
+                self.generadas += 1
+                if self.generadas % self.guardar_cada == 0:
+                    self.almacen.guardar()
+                    logger.info(f"Precálculo: {self.generadas}/{len(pendientes)} generadas")
+            else:
+                self.errores += 1
+            self.detener.wait(self.pausa)
+
+        if self.generadas:
+            self.almacen.guardar()
+        logger.info(f"Precálculo terminado: {self.generadas} generadas, {self.errores} sin respuesta")
@@ -0,0 +1,103 @@
+import gc
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict
+from metricas import logger, traza_actual, anotar_span
+from config import *
+
+# ============================================================
+# POOL DE PROCESOS DE RECUPERACIÓN
+# ============================================================
+#
+# buscar_entradas y la construcción del contexto son Python puro y no escalan
+# con hilos por el GIL. El pool reparte la recuperación entre procesos que se
+# crean con fork cuando el diccionario ya está cargado: todos comparten las
+# páginas del índice del proceso padre (copy-on-write) y ninguno vuelve a
+# ejecutar cargar_diccionario. gc.freeze() saca esos objetos del recolector
+# para que sus pasadas no escriban en las páginas compartidas.
+
+# Estado de cada proceso del pool. Con fork se hereda el diccionario ya
+# cargado del proceso padre; en otro caso el inicializador lo carga.
+datos_trabajador = None
+preparar_trabajador = None
+
+def vigilar_padre(pid_padre: int):
+    """
+    Termina el proceso si el padre desaparece sin cerrar el pool (uvicorn
+    sale relanzando la señal recibida, sin pasar por atexit).
+    """
+    while os.getppid() == pid_padre:
+        time.sleep(1)
+    os._exit(0)
+
+def inicializar_trabajador(cargar: Callable, preparar: Callable, pid_padre: int):
+    global datos_trabajador, preparar_trabajador
+    preparar_trabajador = preparar
+    threading.Thread(target=vigilar_padre, args=(pid_padre,), daemon=True).start()
+    if datos_trabajador is None:
+        datos_trabajador = cargar()
+
+def recuperar(pregunta: str, modo: str = MODO_RESPUESTA) -> Dict:
+    """
+    Recuperación de una pregunta dentro de un proceso del pool. Las fases
+    medidas se devuelven en "spans" para anotarlas en la traza del padre.
+    """
+    spans = {"spans": []}
+    token = traza_actual.set(spans)
+    inicio = time.perf_counter()
+    try:
+        preparado = preparar_trabajador(pregunta, datos_trabajador, modo=modo)
+    finally:
+        traza_actual.reset(token)
+    preparado["recuperacion_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    preparado["spans"] = spans["spans"]
+    return preparado
+
+def pid_trabajador() -> int:
+    return os.getpid()
+
+
+class PoolRecuperacion:
+    """Procesos de recuperación que comparten el diccionario cargado"""
+
+    def __init__(self, datos_diccionario: Dict, cargar: Callable, preparar: Callable, procesos: int):
+        global datos_trabajador
+        datos_trabajador = datos_diccionario
+        self.procesos = procesos
+
+        metodos = multiprocessing.get_all_start_methods()
+        self.fork = "fork" in metodos
+        if self.fork:
+            gc.collect()
+            gc.freeze()
+
+        self.pool = ProcessPoolExecutor(
+            max_workers=procesos,
+            mp_context=multiprocessing.get_context("fork" if self.fork else None),
+            initializer=inicializar_trabajador,
+            initargs=(cargar, preparar, os.getpid())
+        )
+
+    def arrancar(self):
+        """
+        Crea todos los procesos ya, antes de que el servidor abra hilos, en
+        lugar de en la primera petición.
+        """
+        pids = {f.result() for f in [self.pool.submit(pid_trabajador) for _ in range(self.procesos)]}
+        logger.info(f"✓ Pool de recuperación: {len(pids)} procesos ({'fork' if self.fork else 'spawn'})")
+        return self
+
+    def preparar(self, pregunta: str, modo: str = MODO_RESPUESTA) -> Dict:
+        """
+        Recupera en un proceso del pool y anota sus fases en la traza actual.
+        """
+        preparado = self.pool.submit(recuperar, pregunta, modo).result()
+        for span in preparado.pop("spans"):
+            anotar_span(span.pop("span"), span.pop("ms") / 1000, **span)
+        return preparado
+
+    def cerrar(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,61 @@
+from bisect import bisect_left
+from typing import List, Tuple
+from config import *
+
+# ============================================================
+# SUGERENCIAS POR PREFIJO
+# ============================================================
+#
+# Mientras se escribe se proponen términos exactos del diccionario. Elegir uno
+# envía el término tal cual, que buscar_entradas resuelve por coincidencia
+# exacta (y que puede tener respuesta precalculada) sin la búsqueda difusa.
+
+class IndicePrefijos:
+    """
+    Array ordenado de (texto normalizado, término) en el que cada término
+    aparece una vez por cada palabra en la que empieza, para que 'cabe'
+    sugiera también 'dolor de cabeza'. Un prefijo es un rango contiguo del
+    array que se localiza con bisect.
+    """
+
+    def __init__(self, terminos: List[Tuple[str, str, int]]):
+        """
+        terminos: (clave normalizada, término original, popularidad).
+        """
+        self.terminos = [termino for _, termino, _ in terminos]
+        self.popularidad = [peso for _, _, peso in terminos]
+        self.longitud = [len(clave) for clave, _, _ in terminos]
+
+        sufijos = []
+        for i, (clave, _, _) in enumerate(terminos):
+            palabras = clave.split()
+            for j in range(len(palabras)):
+                # j == 0: el término empieza por el prefijo (se prioriza)
+                sufijos.append((" ".join(palabras[j:]), j > 0, i))
+        sufijos.sort()
+        self.claves = [s[0] for s in sufijos]
+        self.entradas = [(s[1], s[2]) for s in sufijos]
+
+    def sugerir(self, prefijo_norm: str, limite: int = MAX_SUGERENCIAS) -> List[str]:
+        """
+        Términos cuyo texto (o alguna de sus palabras) empieza por el prefijo:
+        primero los que empiezan por él, después los más citados y los más cortos.
+        """
+        if len(prefijo_norm) < MIN_CARACTERES_SUGERENCIA:
+            return []
+
+        candidatos = {}
+        posicion = bisect_left(self.claves, prefijo_norm)
+        while posicion < len(self.claves) and self.claves[posicion].startswith(prefijo_norm):
+            interior, i = self.entradas[posicion]
+            candidatos[i] = min(candidatos.get(i, True), interior)
+            posicion += 1
+
+        orden = sorted(
+            candidatos,
+            key=lambda i: (candidatos[i], -self.popularidad[i], self.longitud[i], self.terminos[i])
+        )
+        return [self.terminos[i] for i in orden[:limite]]
+
+    def __len__(self) -> int:
+        return len(self.terminos)
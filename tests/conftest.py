@@ -0,0 +1,13 @@
+import os
+import sys
+
+# Las pruebas usan el backend simulado (sin modelo) y las rutas relativas de
+# config.py, así que se ejecutan desde la raíz del proyecto
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(RAIZ)
+sys.path.insert(0, RAIZ)
+
+os.environ.setdefault("LLM_BACKENDS", "simulado")
+os.environ.setdefault("SIMULADO_MS_TOKEN", "0")
+os.environ.setdefault("SIMULADO_MS_TOKEN_PROMPT", "0")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
@@ -0,0 +1,146 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+# ============================================================
+# SERVIDORES FALSOS DE LOS BACKENDS
+# ============================================================
+#
+# Servidores HTTP locales que hablan los protocolos de Ollama (/api/chat),
+# de la API compatible con OpenAI (/v1/chat/completions) y de Anthropic
+# (/v1/messages), con respuesta normal y en streaming. Cada uno puede tardar
+# (retardo) o fallar (estado) para probar el enrutador con los clientes reales.
+
+
+class ServidorFalso(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, texto: str = "respuesta de prueba"):
+        super().__init__(("127.0.0.1", 0), ManejadorFalso)
+        self.texto = texto
+        self.retardo = 0.0
+        self.estado = 200
+        self.peticiones: List[Dict] = []
+        self.lock = threading.Lock()
+        # Al parar se liberan las peticiones que siguen esperando su retardo
+        self.liberar = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def arrancar(self) -> "ServidorFalso":
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+
+    def parar(self):
+        self.liberar.set()
+        self.shutdown()
+        self.server_close()
+
+
+class ManejadorFalso(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        cuerpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        servidor: ServidorFalso = self.server
+        with servidor.lock:
+            servidor.peticiones.append({"ruta": self.path, "cuerpo": cuerpo})
+        servidor.liberar.wait(servidor.retardo)
+
+        if servidor.estado != 200:
+            self.enviar_json(servidor.estado, {"error": {"type": "api_error", "message": "fallo simulado"}})
+            return
+
+        palabras = servidor.texto.split(" ")
+        fragmentos = [p if i == 0 else f" {p}" for i, p in enumerate(palabras)]
+        if self.path.endswith("/api/chat"):
+            self.ollama(cuerpo, fragmentos)
+        elif self.path.endswith("/chat/completions"):
+            self.openai(cuerpo, fragmentos)
+        elif self.path.endswith("/messages"):
+            self.anthropic(cuerpo, fragmentos)
+        else:
+            self.enviar_json(404, {"error": "ruta desconocida"})
+
+    def enviar_json(self, estado: int, datos: Dict):
+        contenido = json.dumps(datos).encode()
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(contenido)))
+        self.end_headers()
+        self.wfile.write(contenido)
+
+    def enviar_stream(self, tipo: str, lineas: List[str]):
+        self.send_response(200)
+        self.send_header("Content-Type", tipo)
+        self.end_headers()
+        for linea in lineas:
+            self.wfile.write(linea.encode())
+            self.wfile.flush()
+
+    def ollama(self, cuerpo: Dict, fragmentos: List[str]):
+        final = {
+            "model": cuerpo["model"], "created_at": "2026-01-01T00:00:00Z", "done": True,
+            "done_reason": "stop", "total_duration": 3_000_000, "load_duration": 1_000_000,
+            "prompt_eval_count": 10, "prompt_eval_duration": 1_000_000,
+            "eval_count": len(fragmentos), "eval_duration": 1_000_000,
+        }
+        if not cuerpo.get("stream", True):
+            mensaje = {"role": "assistant", "content": "".join(fragmentos)}
+            self.enviar_json(200, {**final, "message": mensaje})
+            return
+        lineas = [
+            json.dumps({"model": cuerpo["model"], "created_at": final["created_at"], "done": False,
+                        "message": {"role": "assistant", "content": f}}) + "\n"
+            for f in fragmentos
+        ]
+        lineas.append(json.dumps({**final, "message": {"role": "assistant", "content": ""}}) + "\n")
+        self.enviar_stream("application/x-ndjson", lineas)
+
+    def openai(self, cuerpo: Dict, fragmentos: List[str]):
+        base = {"id": "chatcmpl-1", "created": 0, "model": cuerpo["model"]}
+        uso = {"prompt_tokens": 10, "completion_tokens": len(fragmentos), "total_tokens": 10 + len(fragmentos)}
+        if not cuerpo.get("stream"):
+            self.enviar_json(200, {
+                **base, "object": "chat.completion", "usage": uso,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "".join(fragmentos)}}],
+            })
+            return
+        trozos = [
+            {**base, "object": "chat.completion.chunk",
+             "choices": [{"index": 0, "delta": {"content": f}, "finish_reason": None}]}
+            for f in fragmentos
+        ]
+        trozos.append({**base, "object": "chat.completion.chunk", "choices": [], "usage": uso})
+        self.enviar_stream("text/event-stream", [f"data: {json.dumps(t)}\n\n" for t in trozos] + ["data: [DONE]\n\n"])
+
+    def anthropic(self, cuerpo: Dict, fragmentos: List[str]):
+        mensaje = {
+            "id": "msg_1", "type": "message", "role": "assistant", "model": cuerpo["model"],
+            "stop_reason": "end_turn", "stop_sequence": None,
+        }
+        if not cuerpo.get("stream"):
+            self.enviar_json(200, {
+                **mensaje, "content": [{"type": "text", "text": "".join(fragmentos)}],
+                "usage": {"input_tokens": 10, "output_tokens": len(fragmentos)},
+            })
+            return
+        eventos = [
+            ("message_start", {"type": "message_start", "message": {
+                **mensaje, "content": [], "stop_reason": None, "usage": {"input_tokens": 10, "output_tokens": 1}}}),
+            ("content_block_start", {"type": "content_block_start", "index": 0,
+                                     "content_block": {"type": "text", "text": ""}}),
+            *[("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                       "delta": {"type": "text_delta", "text": f}}) for f in fragmentos],
+            ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+            ("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                               "usage": {"output_tokens": len(fragmentos)}}),
+            ("message_stop", {"type": "message_stop"}),
+        ]
+        self.enviar_stream("text/event-stream", [f"event: {e}\ndata: {json.dumps(d)}\n\n" for e, d in eventos])
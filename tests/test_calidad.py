@@ -0,0 +1,24 @@
+from calidad import fusionar_entradas, resolver_referencias
+
+VACIA = {"definicion": "", "tecnico": "", "sentido_biologico": "", "conflicto": ""}
+
+
+def entrada(termino, referencias):
+    return {"termino": termino, **VACIA, "referencias_cruzadas": referencias}
+
+def test_fusionar_no_repite_referencias_con_otra_grafia():
+    fusionada = fusionar_entradas(
+        entrada("GLÁNDULAS", ["TIROIDES", "Ganglios linfáticos"]),
+        entrada("GLANDULAS", ["GANGLIOS LINFÁTICOS", "TIROIDES", "HIPÓFISIS"]),
+    )
+    assert fusionada["referencias_cruzadas"] == ["TIROIDES", "Ganglios linfáticos", "HIPÓFISIS"]
+
+def test_resolver_descarta_erratas_de_referencias_resueltas():
+    entradas = [
+        entrada("GLÁNDULAS", ["Ganglios linfáticos", "GLANGLIOS LINFÁTICOS", "HIPERTIROIDISMO", "BAZO"]),
+        entrada("GANGLIOS LINFÁTICOS", []),
+        entrada("HIPOTIROIDISMO", []),
+    ]
+    informe = resolver_referencias(entradas)
+    assert entradas[0]["referencias_cruzadas"] == ["GANGLIOS LINFÁTICOS", "HIPERTIROIDISMO", "BAZO"]
+    assert informe == {"corregidas": 1, "erratas": ["GLANGLIOS LINFÁTICOS"], "sin_destino": ["BAZO", "HIPERTIROIDISMO"]}
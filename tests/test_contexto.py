@@ -0,0 +1,38 @@
+import pytest
+
+import main
+
+
+@pytest.fixture(scope="module")
+def datos():
+    return main.obtener_diccionario()
+
+@pytest.mark.parametrize("pregunta", [
+    "¿Qué es la úlcera?",
+    "¿Diferencias entre asma, bronquitis y neumonía?",
+    "¿Conflicto emocional del estómago?",
+])
+@pytest.mark.parametrize("modo", main.MODOS_RESPUESTA)
+def test_prompt_y_respuesta_caben_en_num_ctx(datos, pregunta, modo):
+    preparado = main.preparar_contexto(pregunta, datos, modo=modo)
+    opciones = preparado["opciones"]
+    assert opciones == main.opciones_generacion(pregunta, len(preparado["fuentes"]), modo)
+    assert 0 < preparado["tokens_contexto"] <= opciones["max_tokens_contexto"]
+
+    mensajes = main.construir_mensajes(pregunta, preparado["contexto"], modo)
+    prompt = sum(main.contar_tokens(m["content"]) for m in mensajes)
+    assert prompt + opciones["num_predict"] <= main.OLLAMA_OPTIONS["num_ctx"]
+
+def test_respuestas_mas_largas_dejan_menos_contexto():
+    pregunta = "¿Qué es la úlcera?"
+    breve = main.opciones_generacion(pregunta, 1, "breve")
+    detallada = main.opciones_generacion(pregunta, 5, "detallada")
+    assert detallada["num_predict"] > breve["num_predict"]
+    assert detallada["max_tokens_contexto"] < breve["max_tokens_contexto"]
+
+@pytest.mark.parametrize("pregunta", ["¿Conflicto del estómago?", "¿Conflictos emocionales del estómago?"])
+def test_campo_pedido_en_singular_y_plural(datos, pregunta):
+    assert main.clasificar_pregunta(pregunta) == "campo"
+    entradas = main.buscar_entradas(pregunta, datos, main.MAX_ENTRADAS_RELEVANTES)
+    pasajes = main.seleccionar_pasajes(pregunta, entradas, datos)
+    assert pasajes[0]["campo"] == "conflicto"
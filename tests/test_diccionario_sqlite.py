@@ -0,0 +1,50 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+import main
+from diccionario_sqlite import abrir_diccionario, exportar
+
+
+@pytest.fixture(scope="module")
+def datos_json():
+    return main.cargar_diccionario()
+
+@pytest.fixture(scope="module")
+def datos_sqlite(datos_json, tmp_path_factory):
+    ruta = tmp_path_factory.mktemp("sqlite") / "diccionario.sqlite"
+    exportar(datos_json["entradas"], str(ruta), origen=main.ENTRADAS_JSON)
+    return abrir_diccionario(str(ruta))
+
+def consultas(datos_json):
+    """
+    Las consultas golden y, para una muestra de términos, el término, su
+    primera palabra y una pregunta sobre él.
+    """
+    with open("benchmarks/consultas_golden.json", encoding="utf-8") as f:
+        preguntas = [c["pregunta"] for c in json.load(f)]
+    for entrada in datos_json["entradas"][::40]:
+        termino = entrada["termino"]
+        preguntas += [termino, termino.split()[0], f"¿Qué conflicto emocional hay en {termino.lower()}?"]
+    preguntas += ["problemas", "¿Diferencias entre asma y bronquitis?", "dolor de cabeza y mareos", "xyzzy"]
+    return preguntas
+
+def test_misma_busqueda_que_el_json(datos_json, datos_sqlite):
+    for pregunta in consultas(datos_json):
+        en_json = [e["termino"] for e in main.buscar_entradas(pregunta, datos_json, main.MAX_ENTRADAS_RELEVANTES)]
+        en_sqlite = [e["termino"] for e in main.buscar_entradas(pregunta, datos_sqlite, main.MAX_ENTRADAS_RELEVANTES)]
+        assert en_sqlite == en_json, pregunta
+
+def test_mismo_contexto_que_el_json(datos_json, datos_sqlite):
+    for pregunta in consultas(datos_json):
+        assert main.preparar_contexto(pregunta, datos_sqlite) == main.preparar_contexto(pregunta, datos_json), pregunta
+
+def test_importar_no_carga_el_chat():
+    codigo = (
+        "import logging, os, sys; os.environ.pop('OLLAMA_HOST', None); import diccionario_sqlite; "
+        "assert not {'main', 'backends', 'precalculo', 'sugerencias'} & set(sys.modules), sys.modules.keys(); "
+        "assert not logging.getLogger().handlers; assert 'OLLAMA_HOST' not in os.environ"
+    )
+    subprocess.run([sys.executable, "-c", codigo], check=True)
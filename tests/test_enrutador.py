@@ -0,0 +1,165 @@
+import time
+
+import pytest
+# Los clientes importan su SDK al primer uso: importados aquí, esa carga no
+# cuenta dentro del LLM_TIMEOUT corto de las pruebas
+import anthropic  # noqa: F401
+import ollama  # noqa: F401
+import openai  # noqa: F401
+
+import backends
+from backends import BackendAnthropic, BackendOllama, BackendOpenAI, EnrutadorLLM
+from servidores_llm import ServidorFalso
+
+MENSAJES = [
+    {"role": "system", "content": "Eres un asistente de pruebas."},
+    {"role": "user", "content": "PREGUNTA: hola"},
+]
+
+
+@pytest.fixture
+def servidores(monkeypatch):
+    """
+    Un servidor falso por backend y tiempos del enrutador cortos.
+    """
+    monkeypatch.setattr(backends, "LLM_TIMEOUT", 1.0)
+    monkeypatch.setattr(backends, "LLM_ENFRIAMIENTO", 60)
+    activos = {
+        nombre: ServidorFalso(f"respuesta de {nombre}").arrancar()
+        for nombre in ("ollama", "openai", "anthropic")
+    }
+    monkeypatch.setenv("OLLAMA_HOST", activos["ollama"].url)
+    monkeypatch.setenv("OPENAI_API_KEY", "clave-de-prueba")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "clave-de-prueba")
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", activos["anthropic"].url)
+    yield activos
+    for servidor in activos.values():
+        servidor.parar()
+
+def crear(nombre: str, servidores) -> backends.BackendLLM:
+    if nombre == "ollama":
+        return BackendOllama("modelo-prueba")
+    if nombre == "openai":
+        return BackendOpenAI("openai", "modelo-prueba", "OPENAI_API_KEY", f"{servidores['openai'].url}/v1")
+    return BackendAnthropic("modelo-prueba")
+
+def enrutador(servidores, *nombres) -> EnrutadorLLM:
+    return EnrutadorLLM([crear(n, servidores) for n in nombres])
+
+# ============================================================
+# CADA BACKEND CONTRA SU SERVIDOR
+# ============================================================
+
+@pytest.mark.parametrize("nombre", ["ollama", "openai", "anthropic"])
+def test_generar(servidores, nombre):
+    texto, metricas = enrutador(servidores, nombre).generar(MENSAJES, {"num_predict": 42, "stop": ["\nPREGUNTA:"]})
+    assert texto == f"respuesta de {nombre}"
+    assert metricas["backend"] == nombre
+    assert metricas["eval_count"] == 3
+
+    cuerpo = servidores[nombre].peticiones[-1]["cuerpo"]
+    if nombre == "ollama":
+        assert cuerpo["options"]["num_predict"] == 42
+        assert cuerpo["options"]["stop"] == ["\nPREGUNTA:"]
+    elif nombre == "openai":
+        assert (cuerpo["max_tokens"], cuerpo["stop"]) == (42, ["\nPREGUNTA:"])
+    else:
+        assert (cuerpo["max_tokens"], cuerpo["stop_sequences"]) == (42, ["\nPREGUNTA:"])
+        assert cuerpo["system"] == MENSAJES[0]["content"]
+
+@pytest.mark.parametrize("nombre", ["ollama", "openai", "anthropic"])
+def test_generar_stream(servidores, nombre):
+    metricas = {}
+    fragmentos = list(enrutador(servidores, nombre).generar_stream(MENSAJES, metricas=metricas))
+    assert "".join(fragmentos) == f"respuesta de {nombre}"
+    assert len(fragmentos) > 1
+    assert metricas["backend"] == nombre
+    assert metricas["eval_count"] == 3
+
+# ============================================================
+# ENRUTADOR
+# ============================================================
+
+@pytest.mark.parametrize("primero, segundo", [("openai", "anthropic"), ("anthropic", "openai")])
+def test_pasa_al_siguiente_si_falla(servidores, primero, segundo):
+    servidores[primero].estado = 500
+    inicio = time.monotonic()
+    texto, metricas = enrutador(servidores, primero, segundo).generar(MENSAJES)
+    assert metricas["backend"] == segundo
+    # Sin reintentos del SDK: una sola petición y sin esperas antes de pasar
+    assert len(servidores[primero].peticiones) == 1
+    assert time.monotonic() - inicio < 0.5
+
+def test_pasa_al_siguiente_si_supera_el_timeout(servidores):
+    servidores["ollama"].retardo = 5
+    router = enrutador(servidores, "ollama", "openai")
+    inicio = time.monotonic()
+    texto, metricas = router.generar(MENSAJES)
+    assert metricas["backend"] == "openai"
+    assert time.monotonic() - inicio < 2.5
+    assert router.estadisticas["ollama"].tasa_error() == 1.0
+
+def test_stream_pasa_al_siguiente_si_falla(servidores):
+    servidores["anthropic"].estado = 500
+    metricas = {}
+    texto = "".join(enrutador(servidores, "anthropic", "ollama").generar_stream(MENSAJES, metricas=metricas))
+    assert texto == "respuesta de ollama"
+    assert metricas["backend"] == "ollama"
+
+def test_cobertura_al_superar_el_p95(servidores):
+    router = enrutador(servidores, "openai", "anthropic")
+    for _ in range(backends.LLM_MIN_MUESTRAS):
+        router.estadisticas["openai"].registrar(0.05, True)
+        router.estadisticas["anthropic"].registrar(0.1, True)
+
+    servidores["openai"].retardo = 0.8
+    inicio = time.monotonic()
+    texto, metricas = router.generar(MENSAJES)
+    assert metricas["backend"] == "anthropic"
+    assert time.monotonic() - inicio < 0.6
+    # Las dos peticiones se lanzaron: la lenta sigue y se registra al terminar
+    assert len(servidores["openai"].peticiones) == 1
+    assert len(servidores["anthropic"].peticiones) == 1
+
+def test_sin_cobertura_por_debajo_del_p95(servidores):
+    router = enrutador(servidores, "openai", "anthropic")
+    for _ in range(backends.LLM_MIN_MUESTRAS):
+        router.estadisticas["openai"].registrar(1.0, True)
+        router.estadisticas["anthropic"].registrar(2.0, True)
+
+    texto, metricas = router.generar(MENSAJES)
+    assert metricas["backend"] == "openai"
+    assert not servidores["anthropic"].peticiones
+
+def test_aparta_el_backend_con_errores_hasta_el_enfriamiento(servidores, monkeypatch):
+    servidores["anthropic"].estado = 500
+    router = enrutador(servidores, "anthropic", "ollama")
+    for _ in range(backends.LLM_MIN_MUESTRAS):
+        assert router.generar(MENSAJES)[1]["backend"] == "ollama"
+    assert len(servidores["anthropic"].peticiones) == backends.LLM_MIN_MUESTRAS
+    assert not router.estadisticas["anthropic"].saludable()
+
+    # Apartado: ya no se le envían peticiones
+    assert router.generar(MENSAJES)[1]["backend"] == "ollama"
+    assert len(servidores["anthropic"].peticiones) == backends.LLM_MIN_MUESTRAS
+
+    # Pasado el enfriamiento se vuelve a probar
+    servidores["anthropic"].estado = 200
+    monkeypatch.setattr(backends, "LLM_ENFRIAMIENTO", 0)
+    assert router.estadisticas["anthropic"].saludable()
+    assert router.generar(MENSAJES)[1]["backend"] == "anthropic"
+
+def test_ordena_por_p50(servidores):
+    servidores["ollama"].retardo = 0.1
+    router = enrutador(servidores, "ollama", "openai")
+
+    # Sin muestras se mide primero el de la lista; con las suficientes pasa
+    # delante el que aún no tiene y, medido, se queda delante el más rápido
+    for _ in range(backends.LLM_MIN_MUESTRAS):
+        assert router.generar(MENSAJES)[1]["backend"] == "ollama"
+    for _ in range(backends.LLM_MIN_MUESTRAS + 2):
+        assert router.generar(MENSAJES)[1]["backend"] == "openai"
+
+    assert [b.nombre for b in router.ordenar()] == ["openai", "ollama"]
+    resumen = router.resumen()
+    assert resumen["openai"]["p50_ms"] < resumen["ollama"]["p50_ms"]
@@ -0,0 +1,27 @@
+import logging
+
+from lote import leer_preguntas
+
+
+def test_leer_preguntas_salta_lineas_no_validas(tmp_path, caplog):
+    entrada = tmp_path / "preguntas.jsonl"
+    entrada.write_text("\n".join([
+        '{"id": "a", "pregunta": " ¿Qué es el asma? "}',
+        '"solo un texto"',
+        '["una", "lista"]',
+        '{"pregunta": 42}',
+        '{"pregunta": null}',
+        '{"pregunta": "   "}',
+        '{no es json',
+        '',
+        '{"pregunta": "¿Y la úlcera?"}',
+    ]), encoding="utf-8")
+
+    with caplog.at_level(logging.WARNING, logger="biodesc"):
+        preguntas = list(leer_preguntas(str(entrada)))
+
+    assert preguntas == [
+        {"id": "a", "pregunta": "¿Qué es el asma?"},
+        {"id": "9", "pregunta": "¿Y la úlcera?"},
+    ]
+    assert len(caplog.records) == 6
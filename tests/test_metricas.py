@@ -0,0 +1,52 @@
+import json
+import logging
+import subprocess
+import sys
+
+import pytest
+
+import main
+import metricas
+
+
+@pytest.fixture(scope="module")
+def datos():
+    return main.obtener_diccionario()
+
+def test_medidores_agrupados_por_familia(monkeypatch):
+    monkeypatch.setattr(metricas, "medidores", [
+        lambda: [("tasa", {"cache": "a"}, 0.5), ("tamano", {"cache": "a"}, 3),
+                 ("tasa", {"cache": "b"}, 0.25), ("tamano", {"cache": "b"}, 7)],
+        lambda: [("tasa", {"cache": "c"}, 1.0)],
+    ])
+    lineas = [l for l in metricas.exportar_prometheus().splitlines() if l.startswith(("tasa", "tamano"))]
+    assert [l.split("{")[0] for l in lineas] == ["tasa"] * 3 + ["tamano"] * 2
+
+def trazas_emitidas(caplog, nombre):
+    return [
+        json.loads(r.getMessage()) for r in caplog.records
+        if r.name == "biodesc.trazas" and json.loads(r.getMessage())["traza"] == nombre
+    ]
+
+def test_stream_emite_una_traza_con_la_generacion(datos, caplog):
+    caplog.set_level(logging.INFO, logger="biodesc.trazas")
+    eventos = list(main.responder_pregunta_stream("¿Qué conflicto emocional hay en el asma?", datos, sesion={}))
+    assert eventos[-1]["tipo"] == "fin"
+
+    trazas = trazas_emitidas(caplog, "pregunta_stream")
+    assert len(trazas) == 1
+    spans = {s["span"] for s in trazas[0]["spans"]}
+    assert {"busqueda", "contexto", "generacion_total"} <= spans
+    assert trazas[0]["num_predict"] == eventos[-1]["metricas"]["num_predict"]
+    assert "biodesc_peticion_segundos_count{traza=\"pregunta_stream_total\"}" not in metricas.exportar_prometheus()
+
+def test_stream_cortado_emite_su_traza(datos, caplog):
+    caplog.set_level(logging.INFO, logger="biodesc.trazas")
+    stream = main.responder_pregunta_stream("¿Qué conflicto emocional hay en el asma?", datos, sesion={})
+    next(stream)
+    stream.close()
+    assert len(trazas_emitidas(caplog, "pregunta_stream")) == 1
+
+def test_importar_main_no_configura_el_logging():
+    codigo = "import logging, main; assert not logging.getLogger().handlers"
+    subprocess.run([sys.executable, "-c", codigo], check=True)
@@ -0,0 +1,50 @@
+import pytest
+
+import main
+from precalculo import AlmacenPrecalculado
+
+
+@pytest.fixture(scope="module")
+def datos():
+    return main.obtener_diccionario()
+
+@pytest.fixture
+def almacen(tmp_path, monkeypatch):
+    """
+    Almacén vacío en un fichero temporal en lugar del compartido.
+    """
+    almacen = AlmacenPrecalculado(str(tmp_path / "precalculadas.json"))
+    monkeypatch.setattr(main, "almacen_precalculado", almacen)
+    return almacen
+
+def precalcular(almacen, datos, *claves):
+    for clave in claves:
+        termino = datos["indice_exacto"][clave]["termino"]
+        almacen.anadir(clave, {"termino": termino, "respuesta": f"respuesta de {clave}", "fuentes": [termino]})
+
+@pytest.mark.parametrize("pregunta", ["alergia", "alergias", "¿Qué es la alergia?"])
+def test_nucleo_con_varios_terminos_no_usa_la_precalculada(datos, almacen, pregunta):
+    # Solo 'alergia al sol' está precalculada, pero el diccionario tiene más
+    precalcular(almacen, datos, "alergia al sol")
+    assert main.buscar_precalculada(pregunta, datos) is None
+
+def test_nucleo_de_un_solo_termino(datos, almacen):
+    precalcular(almacen, datos, "acalasia esofagica")
+    for pregunta in ("acalasia", "¿Qué es la acalasia?", "ACALASIA esofágica"):
+        assert main.buscar_precalculada(pregunta, datos)["respuesta"] == "respuesta de acalasia esofagica"
+
+def test_el_resultado_no_depende_de_lo_precalculado(datos, almacen):
+    precalcular(almacen, datos, "alergia al sol")
+    assert main.buscar_precalculada("alergia al sol", datos)["respuesta"] == "respuesta de alergia al sol"
+    precalcular(almacen, datos, "alergia al polen")
+    assert main.buscar_precalculada("alergia al sol", datos)["respuesta"] == "respuesta de alergia al sol"
+    assert main.buscar_precalculada("alergia", datos) is None
+
+def test_seguimiento_de_la_sesion_no_usa_la_precalculada(datos, almacen):
+    precalcular(almacen, datos, "acalasia esofagica")
+    sesion = {}
+    primera = main.responder_pregunta("acalasia", datos, sesion=sesion)
+    assert primera["metricas"]["backend"] == "precalculada"
+    seguimiento = main.responder_pregunta("¿Y el conflicto?", datos, sesion=sesion)
+    assert seguimiento["metricas"]["backend"] != "precalculada"
+    assert seguimiento["fuentes"] == primera["fuentes"]
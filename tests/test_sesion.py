@@ -0,0 +1,34 @@
+import pytest
+
+import main
+
+
+@pytest.fixture(scope="module")
+def datos():
+    return main.obtener_diccionario()
+
+def conversar(datos, preguntas):
+    """
+    Fuentes de cada turno de una conversación con la misma sesión.
+    """
+    sesion = {}
+    return [
+        main.responder_pregunta(p, datos, usar_precalculadas=False, sesion=sesion)["fuentes"]
+        for p in preguntas
+    ], sesion
+
+def test_seguimiento_sin_terminos_mantiene_la_sesion(datos):
+    fuentes, sesion = conversar(datos, ["¿qué pasa con la úlcera?", "¿cómo se manifiesta?"])
+    assert fuentes[0] and all("ÚLCERA" in t.upper() for t in fuentes[0])
+    assert fuentes[1] == fuentes[0][:main.MAX_ENTRADAS_SEGUIMIENTO]
+    assert sesion["terminos"] == fuentes[0]
+
+def test_seguimiento_de_campo_mantiene_la_sesion(datos):
+    fuentes, sesion = conversar(datos, ["estómago", "¿Y el conflicto?", "¿y su sentido biológico?"])
+    assert all("ESTÓMAGO" in t.upper() for t in fuentes[1] + fuentes[2])
+    assert sesion["terminos"] == fuentes[0]
+
+def test_termino_nuevo_cambia_de_tema(datos):
+    fuentes, sesion = conversar(datos, ["¿qué pasa con la úlcera?", "¿y el asma?"])
+    assert all("ASMA" in t.upper() for t in fuentes[1])
+    assert sesion["terminos"] == fuentes[1]
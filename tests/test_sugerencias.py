@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import main
+from sugerencias import IndicePrefijos
+
+
+@pytest.fixture
+def indice():
+    terminos = ["CABEZA", "DOLOR de CABEZA", "CABELLO", "CADERA", "ESPALDA"]
+    return IndicePrefijos([(main.normalizar(t), t, 0) for t in terminos])
+
+def test_sugiere_por_el_comienzo_de_cualquier_palabra(indice):
+    assert "DOLOR de CABEZA" in indice.sugerir("cabe")
+
+def test_primero_los_que_empiezan_por_el_prefijo(indice):
+    # 'DOLOR de CABEZA' es más citado, pero solo coincide en una palabra interior
+    terminos = [("cabeza", "CABEZA", 0), ("dolor de cabeza", "DOLOR de CABEZA", 9)]
+    assert IndicePrefijos(terminos).sugerir("cabe") == ["CABEZA", "DOLOR de CABEZA"]
+    assert indice.sugerir("ca") == ["CABEZA", "CADERA", "CABELLO", "DOLOR de CABEZA"]
+
+def test_prefijo_minimo(indice):
+    minimo = main.MIN_CARACTERES_SUGERENCIA
+    assert indice.sugerir("cabeza"[:minimo - 1]) == []
+    assert "CABEZA" in indice.sugerir("cabeza"[:minimo])
+
+def test_indice_compartido_se_construye_una_vez(monkeypatch):
+    monkeypatch.setattr(main, "indice_sugerencias", None)
+    with ThreadPoolExecutor(max_workers=8) as hilos:
+        indices = list(hilos.map(lambda _: main.obtener_indice_sugerencias(), range(8)))
+    assert all(i is indices[0] for i in indices)
+
+def test_api_sugerencias():
+    from fastapi.testclient import TestClient
+    cliente = TestClient(main.crear_api())
+
+    sugerencias = cliente.get("/api/sugerencias", params={"q": "cabe"}).json()["sugerencias"]
+    assert "DOLOR de CABEZA" in sugerencias
+    assert sugerencias.index("CABEZA") < sugerencias.index("DOLOR de CABEZA")
+    assert cliente.get("/api/sugerencias", params={"q": "c"}).json() == {"sugerencias": []}
+    assert len(cliente.get("/api/sugerencias", params={"q": "do", "limite": 3}).json()["sugerencias"]) == 3